@@ -0,0 +1,66 @@
+"""Collision-free button assignments for team rounds."""
+import collections
+import logging
+import random
+
+QUEUE_SIZE = 32  # Assignments precomputed per refill
+
+log = logging.getLogger("buzzer.controllers")
+
+
+class ButtonAssigner:
+    """Hands out {team: button} assignments where no two teams share a
+    button and every button is mapped on the selected controller.
+
+    Assignments are precomputed in batches for the current profile and
+    team list, so starting a round is a pop plus O(teams) to apply it.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE, rng=None):
+        self.queue_size = queue_size
+        self.rng = rng or random.Random()
+        self.button_ids = ()
+        self.team_keys = ()
+        self._queue = collections.deque()
+
+    def configure(self, button_ids, team_keys):
+        """Set the buttons to draw from and the teams to assign; a change
+        discards the precomputed queue."""
+        button_ids, team_keys = tuple(button_ids), tuple(team_keys)
+        if (button_ids, team_keys) == (self.button_ids, self.team_keys):
+            return
+        self.button_ids = button_ids
+        self.team_keys = team_keys
+        self._queue.clear()
+        if len(team_keys) > len(button_ids):
+            log.warning("More teams than mapped buttons", extra={"fields": {
+                "teams": len(team_keys), "buttons": len(button_ids)}})
+
+    def _refill(self):
+        count = min(len(self.team_keys), len(self.button_ids))
+        for _ in range(self.queue_size):
+            chosen = self.rng.sample(self.button_ids, count)
+            # Teams beyond the number of buttons get none rather than a
+            # duplicate
+            chosen += [None] * (len(self.team_keys) - count)
+            self._queue.append(dict(zip(self.team_keys, chosen)))
+
+    def next(self):
+        """The next assignment, as {team_key: button_id or None}."""
+        if not self._queue:
+            self._refill()
+        return self._queue.popleft()
+
+    def reroll(self, team, current):
+        """A new button for one team, avoiding the other teams' buttons.
+
+        `current` is the full {team: button} map. Returns the team's
+        existing button if no other is free.
+        """
+        taken = {button for other, button in current.items()
+                 if other != team}
+        free = [b for b in self.button_ids
+                if b not in taken and b != current.get(team)]
+        if not free:
+            return current.get(team)
+        return self.rng.choice(free)
@@ -0,0 +1,177 @@
+"""Per-question buzz analytics kept in compact, append-only columns."""
+import csv
+import io
+import math
+import threading
+from array import array
+
+NAN = float("nan")
+CSV_COLUMNS = ["question", "round", "team", "controller", "captured_at",
+               "received_at", "won", "reaction_ms"]
+
+
+def as_float(value):
+    """A client-supplied number as a float, NaN if missing or invalid."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1,
+              int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[idx], 1)
+
+
+class BuzzLog:
+    """Append-only log of buzz attempts.
+
+    Each field is an array.array column, and team and controller ids are
+    interned to small integers, so thousands of rounds take a few bytes per
+    attempt rather than a dict each.
+    """
+
+    def __init__(self):
+        self.question = array("I")
+        self.round = array("I")  # Buzz round the press was aimed at
+        # Index into teams: the team whose button was pressed, this round's
+        # or a late press on last round's, -1 when no team matched
+        self.team = array("h")
+        self.controller = array("I")  # Index into controllers
+        self.captured_at = array("d")  # Sender clock, NaN if unknown
+        self.received_at = array("d")
+        self.won = array("b")
+        self.reaction_ms = array("f")  # From question shown, NaN if unknown
+        self.teams = []
+        self.controllers = []
+        self._team_index = {}
+        self._controller_index = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.question)
+
+    def _intern(self, value, values, index):
+        idx = index.get(value)
+        if idx is None:
+            idx = index[value] = len(values)
+            values.append(value)
+        return idx
+
+    def record(self, question, round_, team, controller, captured_at,
+               received_at, won, shown_at=None):
+        reaction = NAN
+        if shown_at is not None:
+            reaction = (received_at - shown_at) * 1000
+        with self._lock:
+            team_idx = (-1 if team is None else
+                        self._intern(team, self.teams, self._team_index))
+            self.question.append(question)
+            self.round.append(round_)
+            self.team.append(team_idx)
+            self.controller.append(self._intern(
+                controller, self.controllers, self._controller_index))
+            self.captured_at.append(as_float(captured_at))
+            self.received_at.append(received_at)
+            self.won.append(1 if won else 0)
+            self.reaction_ms.append(reaction)
+
+    def _group(self, keys, mask=None):
+        """Group valid reaction times by the integer column `keys`."""
+        groups = {}
+        for i, (key, reaction) in enumerate(zip(keys, self.reaction_ms)):
+            if key < 0 or math.isnan(reaction):
+                continue
+            if mask is not None and not mask[i]:
+                continue
+            groups.setdefault(key, array("f")).append(reaction)
+        return {key: sorted(values) for key, values in groups.items()}
+
+    def summary(self, top=5):
+        """Reaction percentiles per team, fastest controllers and
+        contested rounds."""
+        with self._lock:
+            per_team = self._group(self.team)
+            per_controller = self._group(self.controller, mask=self.won)
+            attempts = {}
+            wins = {}
+            for team in self.team:
+                attempts[team] = attempts.get(team, 0) + 1
+            for team, won in zip(self.team, self.won):
+                if won:
+                    wins[team] = wins.get(team, 0) + 1
+            # A round is contested when more than one team pressed
+            teams_per_round = {}
+            round_question = {}
+            for question, round_, team in zip(self.question, self.round,
+                                              self.team):
+                if team >= 0:
+                    teams_per_round.setdefault(round_, set()).add(team)
+                    round_question[round_] = question
+            teams = list(self.teams)
+            controllers = list(self.controllers)
+            total = len(self.question)
+
+        team_summary = {}
+        for idx, name in enumerate(teams):
+            reactions = per_team.get(idx, [])
+            team_summary[name] = {
+                "attempts": attempts.get(idx, 0),
+                "wins": wins.get(idx, 0),
+                "p50_ms": percentile(reactions, 50),
+                "p90_ms": percentile(reactions, 90),
+                "best_ms": percentile(reactions, 0),
+            }
+        fastest = sorted(
+            ((controllers[idx], percentile(values, 50), len(values))
+             for idx, values in per_controller.items()),
+            key=lambda row: row[1])[:top]
+        contested = [round_ for round_, pressed in teams_per_round.items()
+                     if len(pressed) > 1]
+        return {
+            "attempts": total,
+            "unmatched": attempts.get(-1, 0),
+            "teams": team_summary,
+            "fastest_controllers": [
+                {"controller": c, "p50_ms": p50, "wins": n}
+                for c, p50, n in fastest
+            ],
+            "contested_rounds": len(contested),
+            "contested_questions": sorted(
+                {round_question[round_] + 1 for round_ in contested}),
+        }
+
+    def iter_csv(self, chunk_rows=1000):
+        """Yield the log as CSV text in chunks, for streaming export."""
+        with self._lock:
+            columns = (array("I", self.question), array("I", self.round),
+                       array("h", self.team),
+                       array("I", self.controller),
+                       array("d", self.captured_at),
+                       array("d", self.received_at), array("b", self.won),
+                       array("f", self.reaction_ms))
+            teams = list(self.teams)
+            controllers = list(self.controllers)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(CSV_COLUMNS)
+        for n, (q, r, t, c, cap, rec, won, react) in enumerate(
+                zip(*columns)):
+            writer.writerow([
+                q + 1,
+                r,
+                teams[t] if t >= 0 else "",
+                controllers[c],
+                "" if math.isnan(cap) else f"{cap:.6f}",
+                f"{rec:.6f}",
+                won,
+                "" if math.isnan(react) else f"{react:.1f}",
+            ])
+            if n % chunk_rows == chunk_rows - 1:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
@@ -1,18 +1,126 @@
-from pynput import keyboard
 import uuid
 import os
+import logging
+import argparse
+from urllib.parse import urlparse
 
 from controllers import controller_mapping
 
-
-import pygame
-import requests
 import time
 import threading
 from utils import get_host_ip
+from input_trace import InputRecorder
+from udp_protocol import UdpInputSender
+from input_outbox import Outbox
+from input_backends import KEYBOARD_ID, BACKENDS, create_backend
+from virtual_buttons import EdgeTracker, DEBOUNCE_INTERVAL
+from log_setup import configure_logging
+
+# requests and the input backend's libraries (pygame/pynput or evdev) are
+# imported where they are first used, so importing this module stays fast
+# and works on headless machines.
 
 GAME_SERVER_URL = "http://localhost:5002"  # Update if needed
-CONTROLLER_ID = get_host_ip()
+CONTROLLER_ID = None  # Defaults to the host IP, resolved in main()
+INPUT_TRANSPORT = "http"  # "http" or "udp" (lower latency on a LAN)
+UDP_PORT = 5003
+UDP_REDUNDANCY = 2  # Copies of each datagram, covers occasional loss
+OUTBOX_SIZE = 256  # Inputs kept while the server is unreachable
+OUTBOX_TTL = 3.0  # Seconds before a queued input is too old to matter
+INPUT_BACKEND = "pygame"  # "pygame" or "evdev" (Linux, no display needed)
+# The server only acts on presses; releases just clear its answer slot
+SEND_RELEASES = False
+
+log = logging.getLogger("buzzer.client")
+input_log = logging.getLogger("buzzer.input")
+
+# Set by --record to capture every input to a trace file
+recorder = None
+
+
+def answer_token(device_id, button):
+    """What the server is sent for a press of `button`."""
+    if device_id == KEYBOARD_ID:
+        return button
+    return f"button_{button}"
+
+
+def record_input(controller_id, button, pressed, captured_at):
+    """Trace a raw input, before debouncing, as the backend reported it."""
+    if recorder is not None:
+        answer = answer_token(controller_id, button) if pressed else None
+        recorder.record(controller_id, button, pressed, answer, captured_at)
+
+
+udp_sender = None
+outbox = None
+
+
+def send_batch(inputs):
+    """Flush queued inputs in one request; False if the server is down."""
+    import requests
+    try:
+        resp = requests.post(
+            f"{GAME_SERVER_URL}/api/answer_batch",
+            json={"inputs": inputs, "sent_at": time.time()},
+            timeout=1
+        )
+    except requests.RequestException:
+        return False
+    if not resp.ok:
+        return False
+    rejected = [r for r in resp.json().get("results", [])
+                if not r["accepted"]]
+    if rejected:
+        log.info("Server rejected %d of %d queued inputs", len(rejected),
+                 len(inputs))
+    return True
+
+
+def get_outbox():
+    global outbox
+    if outbox is None:
+        outbox = Outbox(send_batch, OUTBOX_SIZE, OUTBOX_TTL)
+    return outbox
+
+
+def send_answer(device_id, token, pressed, captured_at):
+    """Send one input edge to the game server.
+
+    token is the answer sent on press (e.g. "button_3" or a key); releases
+    are sent as a None answer over HTTP. HTTP inputs that cannot be
+    delivered are queued in the outbox and flushed when the server is
+    back.
+    """
+    global udp_sender
+    if INPUT_TRANSPORT == "udp":
+        if udp_sender is None:
+            host = urlparse(GAME_SERVER_URL).hostname
+            udp_sender = UdpInputSender(host, UDP_PORT, UDP_REDUNDANCY)
+        try:
+            udp_sender.send(device_id, token, pressed, captured_at)
+        except OSError as e:
+            log.warning("Failed to send input: %s", e)
+        return
+    import requests
+    item = {
+        "controller_id": device_id,
+        "answer": token if pressed else None,
+        "captured_at": captured_at
+    }
+    if outbox is not None and len(outbox):
+        # Keep order: the server sees this after the queued backlog
+        outbox.add(item)
+        return
+    try:
+        requests.post(
+            f"{GAME_SERVER_URL}/api/answer",
+            json=item,
+            timeout=0.5
+        )
+    except requests.RequestException as e:
+        log.warning("Failed to send input, queueing it: %s", e)
+        get_outbox().add(item)
 
 
 UUID_FILE = "controller_uuid.txt"
@@ -25,28 +133,27 @@ def get_or_create_uuid():
         f.write(u)
     return u
 
-## Legacy send_input removed: always use per-controller ID in event loop below
-def register_controllers(controllers):
+def register_controller(device_id, name, joy_id):
+    import requests
     try:
-        for idx, joystick in controllers.items():
-            name = joystick.get_name()
-            joy_id = joystick.get_id()
-            unique_id = get_or_create_uuid() + f"_{joy_id}"
-            extra = {"name": name, "joystick_id": joy_id, "uuid": unique_id}
-            resp = requests.post(
-                f"{GAME_SERVER_URL}/api/register_controller",
-                json={"controller_id": f"{CONTROLLER_ID}_{joy_id}", "extra": extra},
-                timeout=1
-            )
-            if resp.ok:
-                print(f"Controller {joy_id} registered with server.")
-            else:
-                print(f"Failed to register controller {joy_id}: {resp.text}")
+        unique_id = get_or_create_uuid() + f"_{joy_id}"
+        extra = {"name": name, "joystick_id": joy_id, "uuid": unique_id}
+        resp = requests.post(
+            f"{GAME_SERVER_URL}/api/register_controller",
+            json={"controller_id": device_id, "extra": extra},
+            timeout=1
+        )
+        if resp.ok:
+            log.debug("Controller %s registered with server", device_id)
+        else:
+            log.warning("Failed to register controller %s: %s",
+                        device_id, resp.text)
     except Exception as e:
-        print(f"Exception during controller registration: {e}")
+        log.warning("Exception during controller registration: %s", e)
 
 def send_controller_status(controller_id, status):
     """Send controller status update to game server"""
+    import requests
     try:
         requests.post(
             f"{GAME_SERVER_URL}/api/controller_status",
@@ -57,142 +164,124 @@ def send_controller_status(controller_id, status):
             timeout=0.5
         )
     except requests.RequestException as e:
-        print(f"Failed to send controller status: {e}")
+        log.warning("Failed to send controller status: %s", e)
 
 
-def detect_controllers():
-    """Detect currently connected controllers"""
-    pygame.joystick.quit()
-    pygame.joystick.init()
-    current_controllers = {}
-    for i in range(pygame.joystick.get_count()):
-        joystick = pygame.joystick.Joystick(i)
-        joystick.init()
-        current_controllers[i] = joystick
-    return current_controllers
+class ClientSink:
+    """Receives edges from the input backend: logs, records and sends them,
+    and keeps connected controllers registered with the server."""
 
+    def __init__(self, debounce=DEBOUNCE_INTERVAL):
+        self.devices = {}  # device_id -> (name, joystick_id)
+        self.edges = EdgeTracker(debounce)
+        self._names = {}  # device_id -> profile name, for held releases
+        # Also wakes release_flusher() when a release is held back
+        self._lock = threading.Condition()
 
-def main():
-    # Keyboard input using pynput
-    def send_keyboard_event(device_id, answer):
-        def send():
-            try:
-                requests.post(
-                    f"{GAME_SERVER_URL}/api/answer",
-                    json={
-                        "controller_id": device_id,
-                        "answer": answer
-                    },
-                    timeout=0.5
-                )
-            except requests.RequestException as e:
-                print(f"Failed to send keyboard input: {e}")
-        threading.Thread(target=send, daemon=True).start()
-
-    def on_press(key):
-        device_id = "keyboard"
-        try:
-            k = key.char if hasattr(key, 'char') and key.char else str(key)
-        except Exception:
-            k = str(key)
-        button_name = controller_mapping.get_button_name('Keyboard', k)
-        print(f"Keyboard key {button_name} pressed")
-        send_keyboard_event(device_id, k)
-
-    def on_release(key):
-        device_id = "keyboard"
-        try:
-            k = key.char if hasattr(key, 'char') and key.char else str(key)
-        except Exception:
-            k = str(key)
-        button_name = controller_mapping.get_button_name('Keyboard', k)
-        print(f"Keyboard key {button_name} released")
-        send_keyboard_event(device_id, None)
-
-    listener = keyboard.Listener(on_press=on_press, on_release=on_release)
-    listener.start()
-    pygame.init()
-    pygame.joystick.init()
-    
-    # Track controllers and their status
-    controllers = {}
-    last_controller_count = 0
-
-    # Initial controller detection
-    controllers = detect_controllers()
-    for i, joystick in controllers.items():
-        print(f"Detected controller {i}: {joystick.get_name()}")
-    if not controllers:
-        print("No controllers detected. Keyboard input will still work.")
-
-    # Dynamic controller detection and registration
-    def dynamic_controller_manager():
-        nonlocal controllers, last_controller_count
+    def connected(self, device_id, name, joy_id):
+        with self._lock:
+            self.devices[device_id] = (name, joy_id)
+        # Register new controller immediately
+        register_controller(device_id, name, joy_id)
+        send_controller_status(device_id, "active")
+
+    def disconnected(self, device_id):
+        with self._lock:
+            self.devices.pop(device_id, None)
+            self.edges.forget(device_id)
+        send_controller_status(device_id, "inactive")
+
+    def input(self, device_id, device_name, button, pressed, captured_at):
+        record_input(device_id, button, pressed, captured_at)
+        with self._lock:
+            self._names[device_id] = device_name
+            edges = self.edges.update(device_id, button, pressed,
+                                      captured_at)
+            if not pressed:
+                self._lock.notify()
+        for button, pressed, captured_at in edges:
+            self.forward(device_id, device_name, button, pressed,
+                         captured_at)
+
+    def release_flusher(self):
+        """Forward releases once their debounce interval passes without
+        a press cancelling them."""
         while True:
-            try:
-                # Detect current controllers
-                current_controllers = detect_controllers()
-                current_count = len(current_controllers)
-                
-                # Check for newly connected controllers
-                for i, joystick in current_controllers.items():
-                    if i not in controllers:
-                        print(f"New controller detected {i}: "
-                              f"{joystick.get_name()}")
-                        controllers[i] = joystick
-                        # Register new controller immediately
-                        register_controllers({i: joystick})
-                        send_controller_status(f"{CONTROLLER_ID}_{i}",
-                                               "active")
-                
-                # Check for disconnected controllers
-                for i in list(controllers.keys()):
-                    if i not in current_controllers:
-                        print(f"Controller {i} disconnected")
-                        send_controller_status(f"{CONTROLLER_ID}_{i}",
-                                               "inactive")
-                        del controllers[i]
-                
-                # Re-register all active controllers periodically
-                if controllers:
-                    register_controllers(controllers)
-                    for i in controllers.keys():
-                        send_controller_status(f"{CONTROLLER_ID}_{i}",
-                                               "active")
-                
-                last_controller_count = current_count
-            except Exception as e:
-                print(f"Error in controller detection: {e}")
-            
-            time.sleep(2)  # Check every 2 seconds
-
-    threading.Thread(target=dynamic_controller_manager, daemon=True).start()
-
-    while True:
-        for event in pygame.event.get():
-            if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
-                joy_id = event.joy
-                button = event.button
-                pressed = event.type == pygame.JOYBUTTONDOWN
-                joystick = pygame.joystick.Joystick(event.joy)
-                button_name = controller_mapping.get_button_name(
-                    joystick.get_name(), button)
-                status = 'pressed' if pressed else 'released'
-                print(f"Controller {joy_id} Button {button_name} {status}")
-                # Use unique controller_id for each controller
-                try:
-                    requests.post(
-                        f"{GAME_SERVER_URL}/api/answer",
-                        json={
-                            "controller_id": f"{CONTROLLER_ID}_{joy_id}",
-                            "answer": f"button_{button}" if pressed else None
-                        },
-                        timeout=0.5
-                    )
-                except requests.RequestException as e:
-                    print(f"Failed to send input: {e}")
-        time.sleep(0.01)
+            with self._lock:
+                due = self.edges.release_due()
+                while due is None or due > time.time():
+                    self._lock.wait(None if due is None
+                                    else due - time.time())
+                    due = self.edges.release_due()
+                released = [(device_id, self._names.get(device_id), button,
+                             captured_at) for device_id, button, captured_at
+                            in self.edges.flush(time.time())]
+            for device_id, device_name, button, captured_at in released:
+                self.forward(device_id, device_name, button, False,
+                             captured_at)
+
+    def forward(self, device_id, device_name, button, pressed, captured_at):
+        button_name = controller_mapping.get_button_name(device_name, button)
+        status = 'pressed' if pressed else 'released'
+        input_log.debug("%s Button %s (%s) %s", device_id, button_name,
+                        button, status)
+        token = answer_token(device_id, button)
+        if not pressed and not SEND_RELEASES:
+            return
+        if device_id == KEYBOARD_ID and INPUT_TRANSPORT == "http":
+            # Keep the keyboard listener thread free while the request runs
+            threading.Thread(target=send_answer,
+                             args=(device_id, token, pressed, captured_at),
+                             daemon=True).start()
+        else:
+            send_answer(device_id, token, pressed, captured_at)
+
+    def keepalive(self, interval=2.0):
+        """Re-register all active controllers periodically."""
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                devices = list(self.devices.items())
+            for device_id, (name, joy_id) in devices:
+                register_controller(device_id, name, joy_id)
+                send_controller_status(device_id, "active")
+
+
+def main():
+    global CONTROLLER_ID
+    if CONTROLLER_ID is None:
+        CONTROLLER_ID = get_host_ip()
+    backend = create_backend(INPUT_BACKEND, CONTROLLER_ID)
+    log.info("Using %s input backend", backend.name)
+    sink = ClientSink(DEBOUNCE_INTERVAL)
+    threading.Thread(target=sink.keepalive, daemon=True).start()
+    threading.Thread(target=sink.release_flusher, daemon=True).start()
+    backend.run(sink)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buzzer controller client")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Record every input to a JSONL trace file")
+    parser.add_argument("--transport", choices=["http", "udp"],
+                        default=INPUT_TRANSPORT,
+                        help="How inputs are sent to the game server")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        default=INPUT_BACKEND,
+                        help="Where inputs are read from")
+    parser.add_argument("--debounce", type=float, metavar="MS",
+                        default=DEBOUNCE_INTERVAL * 1000,
+                        help="Ignore presses this soon after a release")
+    parser.add_argument("--send-releases", action="store_true",
+                        default=SEND_RELEASES,
+                        help="Also send release edges to the server")
+    args = parser.parse_args()
+    INPUT_TRANSPORT = args.transport
+    INPUT_BACKEND = args.backend
+    DEBOUNCE_INTERVAL = args.debounce / 1000
+    SEND_RELEASES = args.send_releases
+    configure_logging()
+    if args.record:
+        recorder = InputRecorder(args.record)
+        log.info("Recording inputs to %s", args.record)
     main()
\ No newline at end of file
@@ -14,6 +14,10 @@ button_names_ps = {
     12: "Down",
     13: "Left",
     14: "Right",
+    # Analog triggers as virtual buttons (see virtual_buttons.py); axis
+    # numbers vary by platform, e.g. SDL on Linux uses 2 and 5
+    # "axis4+": "L2",
+    # "axis5+": "R2",
 }
 
 
@@ -14,6 +14,11 @@ button_names_switch = {
     12: "Down",
     13: "Left",
     14: "Right",
+    # D-pad on drivers that report it as a hat (see virtual_buttons.py)
+    # "hat0_up": "Up",
+    # "hat0_down": "Down",
+    # "hat0_left": "Left",
+    # "hat0_right": "Right",
 }
 
 
@@ -0,0 +1,73 @@
+import json
+import threading
+from collections import deque
+
+
+class EventFeed:
+    """Shared fan-out buffer for Server-Sent Events viewers.
+
+    Every event is encoded once when it is published; viewers only walk
+    the buffer from the last id they saw, so extra viewers cost a wakeup
+    and a write each.
+    """
+
+    def __init__(self, size=256, heartbeat=15.0):
+        self._events = deque(maxlen=size)  # (event_id, encoded chunk)
+        self._last_id = 0
+        self._cond = threading.Condition()
+        self.heartbeat = heartbeat
+
+    @staticmethod
+    def encode(event, data, event_id=None):
+        payload = json.dumps(data, separators=(",", ":"))
+        lines = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{lines}event: {event}\ndata: {payload}\n\n".encode()
+
+    def publish(self, event, data):
+        with self._cond:
+            self._last_id += 1
+            chunk = self.encode(event, data, self._last_id)
+            self._events.append((self._last_id, chunk))
+            self._cond.notify_all()
+
+    def current_id(self):
+        """Id of the newest event; take it before building a snapshot."""
+        with self._cond:
+            return self._last_id
+
+    def can_resume(self, last_id):
+        """Whether every event after `last_id` is still buffered."""
+        with self._cond:
+            if last_id > self._last_id:
+                return False
+            return not self._events or self._events[0][0] <= last_id + 1
+
+    def _chunks_after(self, last_id):
+        return [chunk for event_id, chunk in self._events
+                if event_id > last_id]
+
+    def stream(self, last_id=None, initial=()):
+        """Yield SSE chunks forever, starting after `last_id`.
+
+        `initial` is a list of (event, data) pairs sent first, used to give
+        new viewers a snapshot of the current state. Pass current_id() as
+        read before the snapshot was built, so events published meanwhile
+        are not lost.
+        """
+        yield b"retry: 3000\n\n"
+        for event, data in initial:
+            yield self.encode(event, data)
+        with self._cond:
+            if last_id is None:
+                last_id = self._last_id
+        while True:
+            with self._cond:
+                if self._last_id == last_id:
+                    self._cond.wait(self.heartbeat)
+                chunks = self._chunks_after(last_id)
+                last_id = self._last_id
+            if chunks:
+                yield b"".join(chunks)
+            else:
+                # Comment line keeps proxies from closing an idle stream
+                yield b": ping\n\n"
@@ -1,21 +1,62 @@
 # ...existing code...
 
 # --- Controller Registration Endpoint ---
-from flask import Flask, render_template, request, jsonify
+from flask import (Flask, Response, render_template, request, jsonify,
+                   send_from_directory)
 # ...existing code...
 # Register controller endpoint
 import os
+import argparse
 
 
-import random
+import copy
+import csv
+import io
+import logging
+import math
+import subprocess
+import threading
+import time
+from collections import deque
 from flask_socketio import SocketIO, emit
 import json
-from utils import get_host_ip
+from utils import (get_host_ip, get_candidate_ips, on_host_ip_change,
+                   start_host_ip_watcher)
 from controllers import controller_mapping
+from event_feed import EventFeed
+import udp_protocol
+from buzz_analytics import BuzzLog
+from question_media import MediaLibrary
+from vote_tally import VoteTally
+import profiler
+from button_assigner import ButtonAssigner
+from log_setup import configure_logging, recent_events
 
 app = Flask(__name__)
 socketio = SocketIO(app)
 
+log = logging.getLogger("buzzer.server")
+input_log = logging.getLogger("buzzer.input")
+controller_log = logging.getLogger("buzzer.controllers")
+
+# Events mirrored to the read-only SSE feed for displays and overlays
+FEED_EVENTS = {"score_update", "question_changed", "team_pressed",
+               "team_color_updated", "prefetch_media", "vote_round_started",
+               "tally_update", "vote_round_ended"}
+event_feed = EventFeed()
+buzz_log = BuzzLog()
+
+
+def broadcast(event, data):
+    """Emit to Socket.IO clients and, if relevant, the SSE feed."""
+    socketio.emit(event, data)
+    if event in FEED_EVENTS:
+        event_feed.publish(event, data)
+        # Each worker keeps its own feed for its SSE clients
+        if state_bus is not None:
+            state_bus.publish("feed", (event, data))
+
+
 @socketio.on('get_selected_controller')
 def handle_get_selected_controller():
     cid = state.get('selected_controller')
@@ -30,41 +71,15 @@ if 'selected_controller' not in state:
 def handle_select_controller(data):
     cid = data.get('controller_id')
     prev = state.get('selected_controller')
-    if cid != prev:
-        # Only regenerate numbers if a new controller is selected
-        # Get button mapping for this controller
-        controller_type = None
-        if cid and 'controller_infos' in state and cid in state['controller_infos']:
-            controller_type = state['controller_infos'][cid]['extra'].get('name', 'Xbox')
-        elif cid == 'keyboard':
-            controller_type = 'Keyboard'  # Handle keyboard controllers specifically
-        else:
-            controller_type = 'Xbox'  # fallback
-        # Get all button ids for this controller type
-        if hasattr(controller_mapping, 'get_all_button_ids'):
-            button_ids = controller_mapping.get_all_button_ids(controller_type)
-        else:
-            # fallback: try 0-15
-            button_ids = list(range(0, 15))
-        # Remove unmapped buttons
-        button_ids = [bid for bid in button_ids if controller_mapping.get_button_name(controller_type, bid) != 'Not Mapped']
-    # Pick unique random buttons for all teams
-    team_keys = list(state["team_numbers"].keys())
-    chosen = random.sample(button_ids, min(len(team_keys), len(button_ids)))
-    
-    # Assign unique buttons to teams, fill with 0 if not enough
-    for i, team_key in enumerate(team_keys):
-        state["team_numbers"][team_key] = chosen[i] if i < len(chosen) else 0
-    
-    # Emit update so team pages reload
-    socketio.emit("controllers_update", {
-        "controllers": list(state["controllers"]),
-        "controller_infos": state.get("controller_infos", {})
-    })
-    socketio.emit('reload_team_pages')
     state['selected_controller'] = cid
-    print(f"Selected controller set to: {cid}")
+    if cid != prev:
+        # New profile: every team page changes, even if its button id
+        # happens to stay the same
+        assign_team_buttons(notify_all=True)
+    controller_log.info("Selected controller set",
+                        extra={"fields": {"controller": cid}})
     socketio.emit('selected_controller', {'controller_id': cid})
+    sync_state()
 
 
 @socketio.on('clear_controller')
@@ -75,11 +90,12 @@ def handle_clear_controller():
         state["team_numbers"][team_key] = 0
     # Clear any previous team buzz
     state["last_team_pressed"] = None
-    socketio.emit("team_pressed", {"team": None})
+    broadcast("team_pressed", {"team": None})
     # Emit update so team pages reload
     socketio.emit("reload_team_pages", {})
     socketio.emit('selected_controller', {'controller_id': None})
-    print("Controller selection cleared")
+    controller_log.info("Controller selection cleared")
+    sync_state()
 
 @app.route("/api/register_controller", methods=["POST"])
 def register_controller():
@@ -96,13 +112,18 @@ def register_controller():
         # Store info in a dict keyed by id
         if "controller_infos" not in state:
             state["controller_infos"] = {}
+        # Clients re-register every couple of seconds; only tell the
+        # master page about controllers that are new or changed
+        changed = state["controller_infos"].get(controller_id) != \
+            controller_info
         state["controller_infos"][controller_id] = controller_info
         state["controllers"].add(controller_id)
-        # Emit full info to master page
-        socketio.emit("controllers_update", {
-            "controllers": list(state["controllers"]),
-            "controller_infos": state["controller_infos"]
-        })
+        if changed:
+            mark_state_changed("controllers")
+            socketio.emit("controller_info", {
+                "controller_id": controller_id,
+                "info": controller_info
+            })
         return jsonify({
             "status": "ok", 
             "controllers": list(state["controllers"]), 
@@ -125,7 +146,11 @@ def update_controller_status():
             state["controller_infos"] = {}
         
         if controller_id in state["controller_infos"]:
-            state["controller_infos"][controller_id]["status"] = status
+            info = state["controller_infos"][controller_id]
+            if info.get("status") == status:
+                # Periodic keepalive, nothing to announce
+                return jsonify({"status": "ok"})
+            info["status"] = status
         else:
             # Create minimal entry for status tracking
             state["controller_infos"][controller_id] = {
@@ -141,13 +166,12 @@ def update_controller_status():
         else:
             # Add back to active controllers
             state["controllers"].add(controller_id)
+        mark_state_changed("controllers")
         
         # Emit update to all clients
         socketio.emit("controller_status_update", {
             "controller_id": controller_id,
-            "status": status,
-            "controllers": list(state["controllers"]),
-            "controller_infos": state["controller_infos"]
+            "status": status
         })
         
         return jsonify({"status": "ok"})
@@ -160,18 +184,83 @@ def update_controller_status():
 # Team random number pages
 
 # Helper to get button name for team page
-def get_team_button_name(team):
-    btn_num = state["team_numbers"][team]
-    # Try to get the selected controller type
+def selected_controller_type():
+    """Controller profile name of the selected controller."""
     selected = state.get('selected_controller')
-    controller_type = None
     if selected and 'controller_infos' in state and selected in state['controller_infos']:
-        controller_type = state['controller_infos'][selected]['extra'].get('name', 'Xbox')
+        return state['controller_infos'][selected]['extra'].get('name', 'Xbox')
     elif selected == 'keyboard':
-        controller_type = 'Keyboard'  # Handle keyboard controllers specifically
-    else:
-        controller_type = 'Xbox'  # fallback
-    return controller_mapping.get_button_name(controller_type, btn_num)
+        return 'Keyboard'  # Handle keyboard controllers specifically
+    return 'Xbox'  # fallback
+
+
+def get_team_button_name(team):
+    btn_num = state["team_numbers"][team]
+    return controller_mapping.get_button_name(selected_controller_type(),
+                                              btn_num)
+
+
+# Precomputed collision-free button assignments for new rounds
+button_assigner = ButtonAssigner()
+
+
+def configure_button_assigner():
+    """Point the assigner at the selected profile's mapped buttons and the
+    current teams (a no-op when neither changed)."""
+    controller_type = selected_controller_type()
+    button_ids = [bid for bid in
+                  controller_mapping.get_all_button_ids(controller_type)
+                  if controller_mapping.get_button_name(controller_type, bid)
+                  != 'Not Mapped']
+    button_assigner.configure(button_ids, state["team_numbers"].keys())
+
+
+def notify_team_button(team):
+    socketio.emit("team_button_changed", {
+        "team": team,
+        "number": state["team_numbers"][team],
+        "button_name": get_team_button_name(team),
+    })
+
+
+def assign_team_buttons(notify_all=False):
+    """Give every team the next precomputed button assignment and notify
+    only the teams whose button changed (all of them with notify_all)."""
+    configure_button_assigner()
+    assignment = button_assigner.next()
+    changed = []
+    with shared_lock:
+        for team, button in assignment.items():
+            if state["team_numbers"].get(team) != button:
+                state["team_numbers"][team] = button
+                changed.append(team)
+    for team in (assignment if notify_all else changed):
+        notify_team_button(team)
+    if changed or notify_all:
+        # Fallback for team pages that miss the in-place update
+        socketio.emit("reload_team_pages", {})
+    return changed
+
+
+def fill_team_buttons():
+    """Reroll teams whose button is unmapped or shared with an earlier
+    team, e.g. teams added since the last round, leaving the rest."""
+    configure_button_assigner()
+    mapped = set(button_assigner.button_ids)
+    taken = set()
+    changed = []
+    with shared_lock:
+        current = dict(state["team_numbers"])
+        for team, button in current.items():
+            if button not in mapped or button in taken:
+                button = button_assigner.reroll(team, current)
+                if button != current[team]:
+                    current[team] = state["team_numbers"][team] = button
+                    changed.append(team)
+            taken.add(button)
+    for team in changed:
+        notify_team_button(team)
+    return changed
 
 @app.route("/<team_key>")
 def dynamic_team_page(team_key):
@@ -207,6 +296,7 @@ def dynamic_team_page(team_key):
     
     # Use the generic team template
     return render_template("team.html",
+                           team_key=team_key,
                            team_number=num,
                            button_name=btn_name,
                            game_started=state["game_started"],
@@ -231,9 +321,67 @@ def team3_page():
     return dynamic_team_page("team3")
 
 
-# Load questions
-with open("questions.json") as f:
-    questions = json.load(f)["questions"]
+# Questions are loaded on first use so importing the server stays cheap
+QUESTIONS_FILE = "questions.json"
+_questions = None
+
+
+def get_questions():
+    global _questions
+    if _questions is None:
+        with open(QUESTIONS_FILE) as f:
+            _questions = json.load(f)["questions"]
+    return _questions
+
+
+# Question images and audio, served from content-hash URLs
+MEDIA_DIR = os.path.join(app.root_path, "media")
+MEDIA_MAX_AGE = 365 * 24 * 3600  # URLs change with content, cache forever
+media_library = MediaLibrary(MEDIA_DIR)
+
+
+def question_payload(index=None):
+    """The question_changed body: the question with its media URLs."""
+    if index is None:
+        index = state["current_question"]
+    questions = get_questions()
+    return {
+        "current_question": index,
+        "total": len(questions),
+        "question": media_library.question_with_media(questions[index]),
+    }
+
+
+def prefetch_payload(index=None):
+    """Media displays should load while question `index` is live: the next
+    question's, plus the previous one's so going back stays instant."""
+    if index is None:
+        index = state["current_question"]
+    questions = get_questions()
+    assets = []
+    for neighbour in (index + 1, index - 1):
+        if 0 <= neighbour < len(questions):
+            assets.extend(media_library.assets(questions[neighbour]))
+    return {"current_question": index, "assets": assets}
+
+
+def announce_question():
+    broadcast("question_changed", question_payload())
+    broadcast("prefetch_media", prefetch_payload())
+
+
+@app.route("/media/<digest>/<path:filename>")
+def media_asset(digest, filename):
+    # Only the current content is served; stale hashes 404 so a cached
+    # URL can never point at different bytes. send_file handles Range
+    # requests and conditional GETs, so long audio can seek and resume.
+    if media_library.digest(filename) != digest:
+        return "Not found", 404
+    response = send_from_directory(MEDIA_DIR, filename,
+                                   max_age=MEDIA_MAX_AGE)
+    response.headers["Cache-Control"] = (f"public, max-age={MEDIA_MAX_AGE}, "
+                                         "immutable")
+    return response
 
 # Game state
 # Game state
@@ -255,9 +403,37 @@ state = {
         "Team 3": "#27ae60"
     },
     # Store random numbers for each team, start at 0
-    "team_numbers": {}
+    "team_numbers": {},
+    # Buttons of the round before, to attribute late presses in analytics
+    "previous_team_numbers": {},
+    # When the current question was first shown, for reaction times
+    "question_shown_at": None,
+    # Round token (bumped on every question change and buzz) and the
+    # /api/state version; shared between workers in multi-worker mode
+    # round_started_ms is when the current round began, in server time
+    "counters": {"round": 0, "version": 0, "round_started_ms": 0}
 }
 
+# Guards read-modify-write of scores and counters. Replaced by a
+# cross-process lock by enable_shared_state().
+shared_lock = threading.RLock()
+
+
+def next_counter(name):
+    """Atomically increment a state counter and return the new value."""
+    with shared_lock:
+        value = state["counters"][name] + 1
+        state["counters"][name] = value
+    return value
+
+
+def new_round():
+    """Start a new buzz round; inputs from older rounds are stale."""
+    with shared_lock:
+        next_counter("round")
+        state["counters"]["round_started_ms"] = int(time.time() * 1000)
+    mark_state_changed("round")
+
 # Initialize team_numbers based on team_scores
 def initialize_team_numbers():
     """Initialize team numbers based on current teams"""
@@ -268,6 +444,37 @@ def initialize_team_numbers():
 
 # Initialize team numbers on startup
 initialize_team_numbers()
+
+# Versioning for /api/state so pollers only fetch what changed
+STATE_HISTORY_SIZE = 256
+STATE_POLL_MAX_WAIT = 30
+state_version = 0
+state_changes = deque(maxlen=STATE_HISTORY_SIZE)  # (version, key)
+state_changed = threading.Condition()
+
+
+def mark_state_changed(*keys, version=None):
+    """Bump the state version and wake long-polling /api/state clients."""
+    global state_version
+    if version is None:
+        version = next_counter("version")
+    with state_changed:
+        state_version = max(state_version, version)
+        for key in keys:
+            state_changes.append((version, key))
+        state_changed.notify_all()
+
+
+def changed_state_keys(since):
+    """Keys changed after version `since`, or None if history is gone."""
+    if since > state_version:
+        return None  # Client saw a previous server run
+    with state_changed:
+        # The oldest version may have lost some of its keys to eviction,
+        # so a diff is only complete if it starts after that version
+        if state_changes and state_changes[0][0] > since:
+            return None
+        return {key for version, key in state_changes if version > since}
 # API to get the current random number for a team
 @app.route("/api/team_number/<team>")
 def get_team_number(team):
@@ -281,7 +488,11 @@ def get_team_number(team):
 def regenerate_team_number(team):
     team = team.lower()
     if team in state["team_numbers"]:
-        state["team_numbers"][team] = random.randint(0, 3)
+        configure_button_assigner()
+        with shared_lock:
+            state["team_numbers"][team] = button_assigner.reroll(
+                team, dict(state["team_numbers"]))
+        notify_team_button(team)
         return jsonify(number=state["team_numbers"][team])
     return jsonify(error="Invalid team"), 404
 
@@ -292,13 +503,14 @@ def change_score():
     team = data.get("team")
     delta = int(data.get("delta", 0))
     if team in state["team_scores"]:
-        state["team_scores"][team] += delta
-        # Prevent negative scores
-        if state["team_scores"][team] < 0:
-            state["team_scores"][team] = 0
+        with shared_lock:
+            # Prevent negative scores
+            state["team_scores"][team] = max(
+                0, state["team_scores"][team] + delta)
+        team_scores = dict(state["team_scores"])
         # Emit update to all clients
-        socketio.emit("score_update", {"team_scores": state["team_scores"]})
-        return jsonify(success=True, team_scores=state["team_scores"])
+        broadcast("score_update", {"team_scores": team_scores})
+        return jsonify(success=True, team_scores=team_scores)
     return jsonify(success=False, error="Invalid team"), 400
 
 
@@ -320,7 +532,7 @@ def home_or_game():
                                ip=host_ip,
                                team_urls=team_urls)
     else:
-        q = questions[state["current_question"]]
+        q = get_questions()[state["current_question"]]
         
         # Convert last_team_pressed key to display name
         last_team_display_name = None
@@ -335,25 +547,29 @@ def home_or_game():
         
         return render_template(
             "game.html",
-            question=q,
+            question=media_library.question_with_media(q),
+            prefetch=prefetch_payload()["assets"],
             question_num=state["current_question"] + 1,
-            total=len(questions),
+            total=len(get_questions()),
             team_scores=state["team_scores"],
             last_team_pressed=last_team_display_name
         )
 
 
+def is_local_request():
+    """Check whether the current request comes from this machine."""
+    client_ip = request.remote_addr
+    return client_ip == "127.0.0.1" or client_ip in get_candidate_ips()
+
+
 @app.route("/master")
 def master_ui():
     # Restrict access to localhost only
-    client_ip = request.remote_addr
-    host_ip = get_host_ip()
-    
-    # Only allow localhost access
-    if not (client_ip == "127.0.0.1" or client_ip == host_ip):
+    if not is_local_request():
         return ("Access denied: Master interface only available "
                 "on local machine"), 403
     
+    questions = get_questions()
     q = questions[state["current_question"]]
     current_idx = state["current_question"]
     
@@ -374,7 +590,9 @@ def master_ui():
         show_ip=state["show_ip"],
         game_started=state["game_started"],
         team_scores=state["team_scores"],
-        team_colors=state["team_colors"]
+        team_colors=state["team_colors"],
+        host_ip=get_host_ip(),
+        candidate_ips=get_candidate_ips()
     )
 
 
@@ -388,26 +606,26 @@ def toggle_ip():
 @app.route("/api/start_game", methods=["POST"])
 def start_game():
     state["game_started"] = True
+    state["question_shown_at"] = time.time()
     socketio.emit("game_started", {})
+    broadcast("prefetch_media", prefetch_payload())
     return jsonify(game_started=True)
 
 
 @app.route("/api/next", methods=["POST"])
 def next_question():
-    if state["current_question"] < len(questions) - 1:
+    if state["current_question"] < len(get_questions()) - 1:
         state["current_question"] += 1
         state["answers"] = {}
         state["last_team_pressed"] = None  # Clear team pressed message
+        state["question_shown_at"] = time.time()
+        mark_state_changed("current_question", "question", "answers")
+        new_round()
+        discard_vote_round()
         # Emit event to all clients
-        socketio.emit(
-            "question_changed",
-            {
-                "current_question": state["current_question"],
-                "question": questions[state["current_question"]],
-            },
-        )
+        announce_question()
         # Clear team pressed message on game page
-        socketio.emit("team_pressed", {"team": None})
+        broadcast("team_pressed", {"team": None})
     return jsonify(success=True)
 
 
@@ -417,31 +635,158 @@ def prev_question():
         state["current_question"] -= 1
         state["answers"] = {}
         state["last_team_pressed"] = None  # Clear team pressed message
+        state["question_shown_at"] = time.time()
+        mark_state_changed("current_question", "question", "answers")
+        new_round()
+        discard_vote_round()
         # Emit event to all clients
-        socketio.emit(
-            "question_changed",
-            {
-                "current_question": state["current_question"],
-                "question": questions[state["current_question"]],
-            },
-        )
+        announce_question()
         # Clear team pressed message on game page
-        socketio.emit("team_pressed", {"team": None})
+        broadcast("team_pressed", {"team": None})
     return jsonify(success=True)
 
 
 @app.route("/api/answer", methods=["POST"])
 def submit_answer():
     data = request.json
-    controller_id = data.get("controller_id")
-    answer = data.get("answer")
-    print(f"Received input from controller: {controller_id}, input: {answer}")
+    matched_team = process_answer(
+        data.get("controller_id"),
+        data.get("answer"),
+        ip=request.remote_addr,
+        user_agent=request.headers.get("User-Agent"),
+        captured_at=data.get("captured_at")
+    )
+    return jsonify(success=True, team=matched_team)
+
+
+# Oldest queued input /api/answer_batch accepts, on the sender's clock
+MAX_BATCH_INPUT_AGE = 3.0
+
+
+def as_timestamp(value):
+    """A client-supplied time as a float, or None if it is not a number."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+@app.route("/api/answer_batch", methods=["POST"])
+def submit_answer_batch():
+    """Inputs a client queued while the server was unreachable.
+
+    Inputs are replayed in capture order. One is rejected if it is older
+    than MAX_BATCH_INPUT_AGE (sent_at - captured_at, both on the client's
+    clock) or was captured before the current round started, so a late
+    backlog cannot buzz for a question that has moved on. Capture times
+    are moved onto the server clock with the sent_at offset.
+    """
+    received_at = time.time()
+    data = request.json
+    inputs = data.get("inputs", [])
+    sent_at = as_timestamp(data.get("sent_at"))
+    captured = [as_timestamp(item.get("captured_at")) for item in inputs]
+    round_started_at = state["counters"]["round_started_ms"] / 1000
+    results = [None] * len(inputs)
+    order = sorted(range(len(inputs)), key=lambda i: captured[i] or 0)
+    for i in order:
+        item = inputs[i]
+        captured_at = captured[i]
+        if captured_at is None or sent_at is None:
+            results[i] = {"accepted": False, "reason": "no timestamp"}
+        elif sent_at - captured_at > MAX_BATCH_INPUT_AGE:
+            results[i] = {"accepted": False, "reason": "stale"}
+        elif captured_at + (received_at - sent_at) < round_started_at:
+            results[i] = {"accepted": False, "reason": "round"}
+        else:
+            team = process_answer(
+                item.get("controller_id"),
+                item.get("answer"),
+                ip=request.remote_addr,
+                user_agent=request.headers.get("User-Agent"),
+                captured_at=captured_at
+            )
+            results[i] = {"accepted": True, "team": team}
+    rejected = sum(1 for r in results if not r["accepted"])
+    if rejected:
+        input_log.info("Rejected queued inputs", extra={"fields": {
+            "rejected": rejected, "total": len(inputs)}})
+    return jsonify(success=True, results=results)
+
+
+def record_buzz(*fields):
+    """Add a buzz attempt to the analytics of every worker."""
+    buzz_log.record(*fields)
+    if state_bus is not None:
+        state_bus.publish("analytics", fields)
+
+
+def match_team(answer, selected, team_numbers=None):
+    """Key of the team whose button `answer` is, or None. Matches against
+    the current buttons unless given other `team_numbers`."""
+    if team_numbers is None:
+        team_numbers = state["team_numbers"]
+    matched_team = None
+    for team, num in team_numbers.items():
+        try:
+            if answer is not None:
+                # Handle keyboard controller differently
+                if selected == "keyboard":
+                    # For keyboard, map the raw key to the team number
+                    # Answer contains raw key (like "a", "b", "Key.esc")
+                    # Find which team number corresponds to this key
+                    for team_key, team_num in team_numbers.items():
+                        expected_key_name = controller_mapping.get_button_name(
+                            "Keyboard", team_num)
+                        # Check if the answer matches this key
+                        actual_key_name = controller_mapping.get_button_name(
+                            "Keyboard", str(answer))
+                        if (expected_key_name == actual_key_name and
+                                expected_key_name != "Not Mapped"):
+                            matched_team = team_key
+                            break
+                else:
+                    # Extract id from 'button_X' or use as int; virtual
+                    # axis/hat buttons keep string ids like 'axis5+'
+                    if (isinstance(answer, str) and
+                            answer.startswith("button_")):
+                        btn_num = answer.split("_", 1)[1]
+                        if btn_num.isdigit():
+                            btn_num = int(btn_num)
+                    else:
+                        btn_num = int(answer)
+                    if btn_num == num:
+                        matched_team = team
+                        break
+        except Exception as e:
+            input_log.warning("Error matching answer %r: %s", answer, e)
+    return matched_team
+
+
+def process_answer(controller_id, answer, ip=None, user_agent=None,
+                   captured_at=None):
+    """Record an input and run buzz arbitration.
+
+    Shared by /api/answer and the UDP listener. Returns the key of the team
+    that buzzed, or None.
+    """
+    received_at = time.time()
+    input_round = state["counters"]["round"]
+    if input_log.isEnabledFor(logging.DEBUG):
+        input_log.debug("Input received", extra={"fields": {
+            "controller": controller_id, "answer": answer}})
     
     # Check if this is a new controller
     is_new_controller = controller_id not in state["controllers"]
     
     state["controllers"].add(controller_id)
     state["answers"][controller_id] = answer
+    if is_new_controller:
+        mark_state_changed("answers", "controllers")
+    else:
+        mark_state_changed("answers")
+    sync_answer(controller_id, answer)
     
     # If new controller and not in controller_infos, create minimal entry
     controller_infos = state.get("controller_infos", {})
@@ -456,16 +801,27 @@ def submit_answer():
         
         state["controller_infos"][controller_id] = {
             "id": controller_id,
-            "ip": request.remote_addr,
+            "ip": ip,
             "status": "active",
             "extra": extra_info,
-            "user_agent": request.headers.get("User-Agent")
+            "user_agent": user_agent
         }
         # Emit update for new controller
-        socketio.emit("controllers_update", {
-            "controllers": list(state["controllers"]),
-            "controller_infos": state["controller_infos"]
+        socketio.emit("controller_info", {
+            "controller_id": controller_id,
+            "info": state["controller_infos"][controller_id]
         })
+        sync_state()
+
+    # During a vote round inputs are option choices, not buzzes. They are
+    # only counted here; tally_update goes out on the next tick.
+    tally = vote_round
+    if tally is not None and not tally.closed:
+        option = vote_option(answer)
+        if option is not None:
+            # No team: controller votes are headcount only
+            record_vote(tally, controller_id, option)
+        return None
     
     # Only allow selected controller to trigger team actions
     selected = state.get('selected_controller')
@@ -473,45 +829,39 @@ def submit_answer():
         # Still flash, but ignore for team actions
         if answer is not None:
             socketio.emit("controller_flash", {"controller_id": controller_id})
-        return jsonify(success=True)
+        return None
     # Emit a flash event for this controller
     if answer is not None:
         socketio.emit("controller_flash", {"controller_id": controller_id})
-    print("Current team numbers:", state["team_numbers"])
-    print("Raw answer value and type:", answer, type(answer))
-    # Check if answer matches any team number
-    matched_team = None
-    for team, num in state["team_numbers"].items():
-        try:
-            if answer is not None:
-                # Handle keyboard controller differently
-                if selected == "keyboard":
-                    # For keyboard, map the raw key to the team number
-                    # Answer contains raw key (like "a", "b", "Key.esc")
-                    # Find which team number corresponds to this key
-                    for team_key, team_num in state["team_numbers"].items():
-                        expected_key_name = controller_mapping.get_button_name(
-                            "Keyboard", team_num)
-                        # Check if the answer matches this key
-                        actual_key_name = controller_mapping.get_button_name(
-                            "Keyboard", str(answer))
-                        if (expected_key_name == actual_key_name and
-                                expected_key_name != "Not Mapped"):
-                            matched_team = team_key
-                            break
-                else:
-                    # Extract number from 'button_X' or use as int
-                    if (isinstance(answer, str) and
-                            answer.startswith("button_")):
-                        btn_num = int(answer.split("_")[1])
-                    else:
-                        btn_num = int(answer)
-                    if btn_num == num:
-                        matched_team = team
-                        break
-        except Exception as e:
-            print(f"Error matching answer: {e}")
-            pass
+    if input_log.isEnabledFor(logging.DEBUG):
+        input_log.debug("Matching input", extra={"fields": {
+            "answer": answer, "team_numbers": dict(state["team_numbers"])}})
+    # Match and start the next round under one cross-process lock, so
+    # two workers cannot both win the same round
+    with shared_lock:
+        matched_team = match_team(answer, selected)
+        # Losing presses are still credited to the team that made them
+        attempt_team, attempt_round = matched_team, input_round
+        if matched_team and state["counters"]["round"] != input_round:
+            # Another buzz won while this input waited for the lock
+            matched_team = None
+        if attempt_team is None:
+            # A late press on the button a team had in the round before
+            attempt_team = match_team(answer, selected,
+                                      state["previous_team_numbers"])
+            attempt_round = input_round - 1
+        if matched_team:
+            state["last_team_pressed"] = matched_team
+            state["previous_team_numbers"] = dict(state["team_numbers"])
+            new_round()
+            # New buttons for the next round; only changed teams hear
+            assign_team_buttons()
+    if answer is not None and state["game_started"]:
+        if attempt_team is None:
+            attempt_round = input_round
+        record_buzz(state["current_question"], attempt_round, attempt_team,
+                    controller_id, captured_at, received_at,
+                    matched_team is not None, state["question_shown_at"])
     if matched_team:
         # Find the team display name from the team key
         team_display_name = None
@@ -523,8 +873,9 @@ def submit_answer():
                 break
         
         if team_display_name:
-            print(f"Team '{team_display_name}' "
-                  f"(key: {matched_team}) has matched!")
+            input_log.info("Team buzzed", extra={"fields": {
+                "team": team_display_name, "key": matched_team,
+                "controller": controller_id}})
             
             # Try to play sound file - check for team number at end of key
             team_number = None
@@ -537,129 +888,312 @@ def submit_answer():
                     team_number = str(team_names.index(team_display_name) + 1)
             
             if team_number:
-                try:
-                    if team_number in ["1", "2", "3"]:
-                        # Play built-in sound for team 1, 2, or 3
-                        os.system(f'afplay sounds/team_{team_number}.mp3')
-                    else:
-                        os.system(f'afplay sounds/team_1.mp3')
-                except Exception as e:
-                    print(f"Could not play sound for team {team_number}: {e}")
+                play_team_sound(team_number)
             
-            state["last_team_pressed"] = matched_team
-            # Regenerate all team numbers
-            for t in state["team_numbers"]:
-                state["team_numbers"][t] = random.randint(0, 3)
-            socketio.emit("team_pressed", {
+            broadcast("team_pressed", {
                 "team": matched_team,
                 "team_display_name": team_display_name
             })
             socketio.emit("reload_post_buzz", {})
-            socketio.emit("reload_team_pages", {})
+            sync_state()
+    return matched_team
+
+
+# --- Everyone-answers vote rounds ---
+# Phones vote from a team page, so their votes carry the team and score.
+# Controllers are not tied to a team (every button may belong to any team
+# next round), so controller votes count towards the headcount only.
+TALLY_TICK = 0.25  # Seconds between tally_update broadcasts
+VOTE_POINTS = 1  # Points a team earns per correct vote
+vote_round = None  # VoteTally for the current (or last ended) round
+
+
+def vote_option(answer):
+    """Map an input to an option index: button_N is option N, keyboard
+    digit keys 1-9 are options 0-8. Returns None for anything else."""
+    if answer is None or isinstance(answer, bool):
+        return None
+    if isinstance(answer, int):
+        return answer
+    answer = str(answer)
+    if answer.startswith("button_"):
+        answer = answer.split("_", 1)[1]
+        return int(answer) if answer.isdigit() else None
+    if len(answer) == 1 and answer in "123456789":
+        return int(answer) - 1
+    return None
+
+
+def record_vote(tally, controller_id, option, team=None):
+    """Count a vote here and mirror it to the other workers."""
+    if not tally.vote(controller_id, option, team):
+        return False
+    if state_bus is not None:
+        state_bus.publish("vote", {"vote": (controller_id, option, team)})
+    return True
+
+
+def apply_vote_sync(sender_id, data):
+    global vote_round
+    if sender_id == os.getpid():
+        return
+    if "start" in data:
+        vote_round = VoteTally(*data["start"])
+    elif vote_round is None:
+        return
+    elif "vote" in data:
+        vote_round.vote(*data["vote"])
+    elif "end" in data:
+        vote_round.close()
+
+
+def tally_ticker():
+    """Broadcast the tally at most once per tick, and only if it changed."""
+    last = None
+    while True:
+        time.sleep(TALLY_TICK)
+        tally = vote_round
+        if tally is None or tally.closed:
+            continue
+        if (tally, tally.version) != last:
+            last = (tally, tally.version)
+            broadcast("tally_update", tally.snapshot())
+
+
+def start_tally_ticker():
+    threading.Thread(target=tally_ticker, daemon=True).start()
+
+
+@app.route("/api/vote_round/start", methods=["POST"])
+def start_vote_round():
+    global vote_round
+    q = get_questions()[state["current_question"]]
+    options = q.get("options", [])
+    if not options:
+        return jsonify(success=False, error="Question has no options"), 400
+    correct = q.get("correct_answer")
+    correct = options.index(correct) if correct in options else None
+    vote_round = VoteTally(options, correct)
+    if state_bus is not None:
+        state_bus.publish("vote", {"start": (options, correct)})
+    log.info("Vote round started", extra={"fields": {
+        "question": state["current_question"]}})
+    broadcast("vote_round_started", vote_round.snapshot())
     return jsonify(success=True)
 
 
-@app.route("/api/add_team", methods=["POST"])
-def add_team():
+@app.route("/api/vote_round/end", methods=["POST"])
+def end_vote_round():
+    tally = vote_round
+    if tally is None or tally.closed:
+        return jsonify(success=False, error="No vote round open"), 400
+    final = tally.close()
+    if state_bus is not None:
+        state_bus.publish("vote", {"end": True})
+    # Score every team in one pass, then send a single score update
+    earned = tally.score(VOTE_POINTS)
+    with shared_lock:
+        for team, points in earned.items():
+            if team in state["team_scores"]:
+                state["team_scores"][team] += points
+    team_scores = dict(state["team_scores"])
+    final["correct"] = tally.correct
+    final["earned"] = earned
+    log.info("Vote round ended", extra={"fields": {
+        "votes": final["total"], "earned": earned}})
+    broadcast("vote_round_ended", final)
+    broadcast("score_update", {"team_scores": team_scores})
+    return jsonify(success=True, **final)
+
+
+def discard_vote_round():
+    """Close an open vote round without scoring it, when the question it
+    was for goes away."""
+    tally = vote_round
+    if tally is None or tally.closed:
+        return
+    final = tally.close()
+    if state_bus is not None:
+        state_bus.publish("vote", {"end": True})
+    final["discarded"] = True
+    log.info("Vote round discarded", extra={"fields": {
+        "votes": final["total"]}})
+    broadcast("vote_round_ended", final)
+
+
+@app.route("/api/vote_round")
+def get_vote_round():
+    tally = vote_round
+    if tally is None:
+        return jsonify(active=False)
+    return jsonify(active=not tally.closed, **tally.snapshot())
+
+
+@app.route("/api/vote", methods=["POST"])
+def submit_vote():
+    """Option choice from a phone or other web client."""
     data = request.json
-    team_name = data.get("team_name", "").strip()
-    
+    tally = vote_round
+    if tally is None or tally.closed:
+        return jsonify(success=False, error="No vote round open"), 409
+    controller_id = data.get("controller_id")
+    option = data.get("option")
+    team = data.get("team")
+    if (not controller_id or not isinstance(option, int)
+            or isinstance(option, bool)):
+        return jsonify(success=False,
+                       error="controller_id and option are required"), 400
+    if team not in state["team_scores"]:
+        team = None
+    if not record_vote(tally, controller_id, option, team):
+        return jsonify(success=False, error="Invalid option"), 400
+    return jsonify(success=True)
+
+
+# --- Team management ---
+TEAM_COLORS = ["#2a7ae2", "#e74c3c", "#27ae60", "#f39c12",
+               "#9b59b6", "#34495e", "#e67e22", "#1abc9c"]
+TEAM_TABLES = ("team_scores", "team_colors", "team_numbers")
+
+
+def team_key(team_name):
+    """URL key of a team, e.g. "Team 1" -> "team1"."""
+    return team_name.lower().replace(" ", "").replace("_", "")
+
+
+def team_tables():
+    """Working copies of the team tables; apply changes to these, then
+    commit_team_tables() them, so a failed change leaves state alone.
+    Hold shared_lock from the copy to the commit, or a score or team change
+    made in between is overwritten."""
+    return {key: dict(state[key]) for key in TEAM_TABLES}
+
+
+def add_team_to(tables, team_name, color=None):
     if not team_name:
-        return jsonify(success=False, error="Team name cannot be empty")
-    
-    if team_name in state["team_scores"]:
-        return jsonify(success=False, error="Team name already exists")
-    
-    # Add team to scores
-    state["team_scores"][team_name] = 0
-    
-    # Assign a default color (generate from team name or use a default palette)
-    default_colors = ["#2a7ae2", "#e74c3c", "#27ae60", "#f39c12",
-                      "#9b59b6", "#34495e", "#e67e22", "#1abc9c"]
-    team_index = len(state["team_colors"])
-    default_color = default_colors[team_index % len(default_colors)]
-    state["team_colors"][team_name] = default_color
-    
-    # Generate team key for URL routing
-    team_key = team_name.lower().replace(" ", "").replace("_", "")
-    if team_key not in state["team_numbers"]:
-        state["team_numbers"][team_key] = 0
-    
-    # Emit updates to all clients
-    socketio.emit("team_list_updated", {"team_scores": state["team_scores"]})
+        raise ValueError("Team name cannot be empty")
+    if team_name in tables["team_scores"]:
+        raise ValueError("Team name already exists")
+    tables["team_scores"][team_name] = 0
+    if color:
+        set_team_color_in(tables, team_name, color)
+    else:
+        # Next colour of the default palette
+        index = len(tables["team_colors"])
+        tables["team_colors"][team_name] = TEAM_COLORS[
+            index % len(TEAM_COLORS)]
+    tables["team_numbers"].setdefault(team_key(team_name), 0)
+
+
+def rename_team_in(tables, old_name, new_name):
+    if not new_name:
+        raise ValueError("Team name cannot be empty")
+    if old_name not in tables["team_scores"]:
+        raise ValueError("Original team not found")
+    if new_name != old_name and new_name in tables["team_scores"]:
+        raise ValueError("New team name already exists")
+    # Rebuild to keep the team's position in the order
+    tables["team_scores"] = {
+        (new_name if name == old_name else name): score
+        for name, score in tables["team_scores"].items()}
+    if old_name in tables["team_colors"]:
+        tables["team_colors"][new_name] = tables["team_colors"].pop(old_name)
+    old_key, new_key = team_key(old_name), team_key(new_name)
+    if old_key != new_key and old_key in tables["team_numbers"]:
+        tables["team_numbers"][new_key] = tables["team_numbers"].pop(old_key)
+
+
+def delete_team_from(tables, team_name):
+    if not team_name:
+        raise ValueError("Team name cannot be empty")
+    if team_name not in tables["team_scores"]:
+        raise ValueError("Team not found")
+    tables["team_scores"].pop(team_name)
+    tables["team_colors"].pop(team_name, None)
+    tables["team_numbers"].pop(team_key(team_name), None)
+
+
+def set_team_color_in(tables, team_name, color):
+    if not color:
+        raise ValueError("Team color cannot be empty")
+    if team_name not in tables["team_scores"]:
+        raise ValueError("Team not found")
+    # Validate hex color format
+    if not color.startswith("#") or len(color) != 7:
+        raise ValueError("Invalid color format")
+    tables["team_colors"][team_name] = color
+
+
+def commit_team_tables(tables):
+    """Validate the working copies and make them the live team tables."""
+    if not tables["team_scores"]:
+        raise ValueError("Cannot delete the last team")
+    keys = {}
+    for name in tables["team_scores"]:
+        other = keys.setdefault(team_key(name), name)
+        if other != name:
+            raise ValueError(f"Teams {other!r} and {name!r} would share "
+                             f"the page /{team_key(name)}")
+    with shared_lock:
+        # Shared maps (multi-worker mode) are checked before any write
+        for key in TEAM_TABLES:
+            if not isinstance(state[key], dict):
+                state[key].replace(tables[key])
+            else:
+                state[key] = tables[key]
+    # New teams start without a button
+    fill_team_buttons()
+
+
+def announce_team_list():
+    """One consolidated update for every screen showing teams."""
+    socketio.emit("team_list_updated", {
+        "team_scores": dict(state["team_scores"]),
+        "team_colors": dict(state["team_colors"])
+    })
     socketio.emit("reload_home_page", {})
-    
+
+
+@app.route("/api/add_team", methods=["POST"])
+def add_team():
+    data = request.json
+    with shared_lock:
+        tables = team_tables()
+        try:
+            add_team_to(tables, data.get("team_name", "").strip())
+            commit_team_tables(tables)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e))
+    announce_team_list()
     return jsonify(success=True)
 
 
 @app.route("/api/update_team_name", methods=["POST"])
 def update_team_name():
     data = request.json
-    old_name = data.get("old_name", "").strip()
-    new_name = data.get("new_name", "").strip()
-    
-    if not new_name:
-        return jsonify(success=False, error="Team name cannot be empty")
-    
-    if old_name not in state["team_scores"]:
-        return jsonify(success=False, error="Original team not found")
-    
-    if new_name != old_name and new_name in state["team_scores"]:
-        return jsonify(success=False, error="New team name already exists")
-    
-    # Update team scores dictionary
-    score = state["team_scores"].pop(old_name)
-    state["team_scores"][new_name] = score
-    
-    # Update team color dictionary
-    if old_name in state["team_colors"]:
-        color = state["team_colors"].pop(old_name)
-        state["team_colors"][new_name] = color
-    
-    # Update team numbers if the key changed
-    old_key = old_name.lower().replace(" ", "").replace("_", "")
-    new_key = new_name.lower().replace(" ", "").replace("_", "")
-    
-    if old_key != new_key and old_key in state["team_numbers"]:
-        state["team_numbers"][new_key] = state["team_numbers"].pop(old_key)
-    
-    # Emit updates to all clients
-    socketio.emit("team_list_updated", {"team_scores": state["team_scores"]})
-    socketio.emit("reload_home_page", {})
-    
+    with shared_lock:
+        tables = team_tables()
+        try:
+            rename_team_in(tables, data.get("old_name", "").strip(),
+                           data.get("new_name", "").strip())
+            commit_team_tables(tables)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e))
+    announce_team_list()
     return jsonify(success=True)
 
 
 @app.route("/api/delete_team", methods=["POST"])
 def delete_team():
     data = request.json
-    team_name = data.get("team_name", "").strip()
-    
-    if not team_name:
-        return jsonify(success=False, error="Team name cannot be empty")
-    
-    if team_name not in state["team_scores"]:
-        return jsonify(success=False, error="Team not found")
-    
-    if len(state["team_scores"]) <= 1:
-        return jsonify(success=False, error="Cannot delete the last team")
-    
-    # Remove team from scores
-    state["team_scores"].pop(team_name)
-    
-    # Remove team color
-    if team_name in state["team_colors"]:
-        state["team_colors"].pop(team_name)
-    
-    # Remove from team numbers if exists
-    team_key = team_name.lower().replace(" ", "").replace("_", "")
-    if team_key in state["team_numbers"]:
-        state["team_numbers"].pop(team_key)
-    
-    # Emit updates to all clients
-    socketio.emit("team_list_updated", {"team_scores": state["team_scores"]})
-    socketio.emit("reload_home_page", {})
-    
+    with shared_lock:
+        tables = team_tables()
+        try:
+            delete_team_from(tables, data.get("team_name", "").strip())
+            commit_team_tables(tables)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e))
+    announce_team_list()
     return jsonify(success=True)
 
 
@@ -668,25 +1202,18 @@ def update_team_color():
     data = request.json
     team_name = data.get("team_name", "").strip()
     team_color = data.get("team_color", "").strip()
-    
     if not team_name:
         return jsonify(success=False, error="Team name cannot be empty")
-    
-    if not team_color:
-        return jsonify(success=False, error="Team color cannot be empty")
-    
-    if team_name not in state["team_scores"]:
-        return jsonify(success=False, error="Team not found")
-    
-    # Validate hex color format
-    if not team_color.startswith("#") or len(team_color) != 7:
-        return jsonify(success=False, error="Invalid color format")
-    
-    # Update team color
-    state["team_colors"][team_name] = team_color
+    with shared_lock:
+        tables = team_tables()
+        try:
+            set_team_color_in(tables, team_name, team_color)
+            commit_team_tables(tables)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e))
     
     # Emit updates to all clients
-    socketio.emit("team_color_updated", {
+    broadcast("team_color_updated", {
         "team_name": team_name,
         "team_color": team_color
     })
@@ -694,18 +1221,451 @@ def update_team_color():
     return jsonify(success=True)
 
 
+TEAM_OPS = {
+    "add": lambda tables, op: add_team_to(
+        tables, op.get("name", "").strip(), op.get("color", "").strip()),
+    "rename": lambda tables, op: rename_team_in(
+        tables, op.get("old_name", "").strip(),
+        op.get("new_name", "").strip()),
+    "delete": lambda tables, op: delete_team_from(
+        tables, op.get("name", "").strip()),
+    "color": lambda tables, op: set_team_color_in(
+        tables, op.get("name", "").strip(), op.get("color", "").strip()),
+}
+
+
+def parse_team_csv(text):
+    """Rows of name[,color] (an optional "name,color" header is skipped)
+    as add operations."""
+    ops = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or not row[0].strip():
+            continue
+        if not ops and row[0].strip().lower() == "name":
+            continue
+        ops.append({"op": "add", "name": row[0],
+                    "color": row[1] if len(row) > 1 else ""})
+    return ops
+
+
+@app.route("/api/teams/batch", methods=["POST"])
+def batch_teams():
+    """Apply many team changes at once, all or nothing.
+
+    JSON body {"ops": [{"op": "add", "name", "color"?},
+    {"op": "rename", "old_name", "new_name"}, {"op": "delete", "name"},
+    {"op": "color", "name", "color"}], "replace": bool}, or a text/csv
+    body of name[,color] rows to import. With replace (?replace=1 for
+    CSV) the existing teams are removed first. Screens get a single
+    team_list_updated however many teams changed.
+    """
+    if request.mimetype == "text/csv":
+        ops = parse_team_csv(request.get_data(as_text=True))
+        replace = request.args.get("replace", "0") not in ("0", "false")
+    else:
+        data = request.json or {}
+        ops = data.get("ops", [])
+        if "csv" in data:
+            ops = parse_team_csv(data["csv"]) + ops
+        replace = bool(data.get("replace"))
+    with shared_lock:
+        tables = team_tables()
+        if replace:
+            tables = {key: {} for key in TEAM_TABLES}
+        for index, op in enumerate(ops):
+            apply_op = TEAM_OPS.get(op.get("op"))
+            try:
+                if apply_op is None:
+                    raise ValueError(f"Unknown operation {op.get('op')!r}")
+                apply_op(tables, op)
+            except ValueError as e:
+                return jsonify(success=False, error=str(e), index=index), 400
+        try:
+            commit_team_tables(tables)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e)), 400
+    log.info("Teams updated in batch", extra={"fields": {
+        "operations": len(ops), "teams": len(tables["team_scores"])}})
+    announce_team_list()
+    return jsonify(success=True, team_scores=dict(state["team_scores"]),
+                   team_colors=dict(state["team_colors"]))
+
+
+def build_state_payload(keys=None):
+    """Build the /api/state body, optionally limited to `keys`."""
+    payload = {
+        "current_question": lambda: state["current_question"],
+        "answers": lambda: state["answers"],
+        "controllers": lambda: list(state["controllers"]),
+        "question": lambda: question_payload()["question"],
+        "round": lambda: state["counters"]["round"],
+    }
+    if keys is None:
+        keys = payload.keys()
+    return {key: payload[key]() for key in keys if key in payload}
+
+
 @app.route("/api/state")
 def get_state():
-    return jsonify(
-        {
-            "current_question": state["current_question"],
-            "answers": state["answers"],
-            "controllers": list(state["controllers"]),
-            "question": questions[state["current_question"]],
-        }
+    """Current game state.
+
+    Pollers may pass `since=<version>` (or an If-None-Match ETag) to get
+    304 Not Modified or only the keys changed since that version, and
+    `wait=<seconds>` to hold the request until something changes.
+    """
+    since = request.args.get("since", type=int)
+    etag = request.headers.get("If-None-Match", "").strip('W/"')
+    if since is None and etag.isdigit():
+        since = int(etag)
+    wait = min(request.args.get("wait", 0, type=float), STATE_POLL_MAX_WAIT)
+
+    if since is not None and since == state_version and wait > 0:
+        deadline = time.monotonic() + wait
+        with state_changed:
+            while state_version == since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                state_changed.wait(remaining)
+
+    version = state_version
+    if since is not None and since == version:
+        response = app.response_class(status=304)
+    else:
+        keys = changed_state_keys(since) if since is not None else None
+        body = build_state_payload(keys)
+        body["version"] = version
+        body["diff"] = keys is not None
+        response = jsonify(body)
+    response.headers["ETag"] = f'"{version}"'
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# Headless mode never touches audio (set by --headless or BUZZER_HEADLESS=1)
+HEADLESS = os.environ.get("BUZZER_HEADLESS") == "1"
+
+
+def play_team_sound(team_number):
+    """Play a team's buzz sound without blocking the request."""
+    if HEADLESS:
+        return
+    if team_number not in ["1", "2", "3"]:
+        team_number = "1"
+    try:
+        subprocess.Popen(["afplay", f"sounds/team_{team_number}.mp3"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        log.warning("Could not play sound for team %s: %s", team_number, e)
+
+
+# Binary input datagrams from controller_client (see udp_protocol.py)
+UDP_PORT = 5003
+
+
+def handle_udp_input(controller_id, button, pressed, captured_at, addr):
+    process_answer(controller_id, button if pressed else None,
+                   ip=addr[0], user_agent="udp", captured_at=captured_at)
+
+
+def handle_host_ip_change(host_ip, candidate_ips):
+    socketio.emit("host_ip_changed", {
+        "host_ip": host_ip,
+        "candidate_ips": candidate_ips
+    })
+
+
+@app.route("/api/analytics")
+def analytics_summary():
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    return jsonify(buzz_log.summary())
+
+
+@app.route("/api/analytics/export.csv")
+def analytics_export():
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    return Response(
+        buzz_log.iter_csv(),
+        mimetype="text/csv",
+        headers={"Content-Disposition":
+                 "attachment; filename=buzz_analytics.csv"},
     )
 
 
+@app.route("/api/logs")
+def recent_logs():
+    """Recent structured log events for the master UI."""
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    limit = request.args.get("limit", 100, type=int)
+    min_level = request.args.get("level", "INFO")
+    return jsonify(events=recent_events(limit, min_level))
+
+
+@app.route("/api/profile/start", methods=["POST"])
+def start_profile():
+    """Profile this server process for a few seconds."""
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    data = request.json or {}
+    try:
+        session = profiler.start_session(
+            data.get("mode", "sampling"),
+            data.get("seconds", profiler.DEFAULT_SECONDS))
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+    except RuntimeError as e:
+        return jsonify(success=False, error=str(e)), 409
+    log.info("Profiling started", extra={"fields": session.status()})
+    return jsonify(success=True, **session.status())
+
+
+@app.route("/api/profile/stop", methods=["POST"])
+def stop_profile():
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    session = profiler.current_session()
+    if session is None:
+        return jsonify(success=False, error="No profiling session"), 404
+    session.stop()
+    return jsonify(success=True, **session.status())
+
+
+@app.route("/api/profile/report")
+def profile_report():
+    """Hot functions as text, or ?format=collapsed for flame graphs."""
+    if not is_local_request():
+        return jsonify(error="Master interface only"), 403
+    session = profiler.current_session()
+    if session is None:
+        return jsonify(error="No profiling session"), 404
+    fmt = request.args.get("format", "text")
+    limit = request.args.get("limit", 30, type=int)
+    try:
+        report = session.report(fmt, limit)
+    except RuntimeError as e:
+        return jsonify(error=str(e), **session.status()), 409
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return Response(report, mimetype="text/plain")
+
+
+@app.route("/api/events")
+def event_stream():
+    """One-way Server-Sent Events feed of scores, questions and buzzes."""
+    last_id = request.headers.get("Last-Event-ID", type=int)
+    if last_id is None:
+        last_id = request.args.get("last_id", type=int)
+    initial = []
+    if last_id is None or not event_feed.can_resume(last_id):
+        # Events published while the snapshot is built are sent after it
+        last_id = event_feed.current_id()
+        initial = [
+            ("score_update", {"team_scores": dict(state["team_scores"])}),
+            ("question_changed", question_payload()),
+            ("prefetch_media", prefetch_payload()),
+        ]
+    return Response(
+        event_feed.stream(last_id, initial),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx and similar proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+# --- Multi-worker mode ---
+# Scores, team button numbers and counters live in shared memory; the rest
+# of the state is replicated between workers over a local bus, which also
+# carries Socket.IO broadcasts so every client sees every emit.
+MAX_SHARED_TEAMS = 64
+SYNCED_STATE_KEYS = ("current_question", "answers", "controllers",
+                     "controller_infos", "show_ip", "game_started",
+                     "team_colors", "selected_controller",
+                     "last_team_pressed", "question_shown_at",
+                     "previous_team_numbers")
+state_bus = None  # local_bus.BusClient when running as a worker
+# Replicated values as last sent or received, to publish only changes
+synced_values = {}
+# /api/state keys to mark changed when a replicated key arrives
+SYNCED_POLL_KEYS = {"current_question": ("current_question", "question"),
+                    "answers": ("answers",),
+                    "controllers": ("controllers",)}
+# Passed to io() in the templates; workers need websocket-only clients
+# because polling requests are not pinned to one worker
+SOCKETIO_CLIENT_OPTIONS = {}
+
+
+@app.context_processor
+def inject_socketio_options():
+    return {"socketio_options": SOCKETIO_CLIENT_OPTIONS}
+
+
+def sync_state():
+    """Send the replicated keys that changed since the last sync to the
+    other workers, with this worker's state version."""
+    if state_bus is None:
+        return
+    snapshot = {key: copy.deepcopy(state[key]) for key in SYNCED_STATE_KEYS
+                if key in state and (key not in synced_values
+                                     or synced_values[key] != state[key])}
+    if not snapshot:
+        return
+    synced_values.update(copy.deepcopy(snapshot))
+    state_bus.publish("state", {"snapshot": snapshot,
+                                "version": state_version})
+
+
+def sync_answer(controller_id, answer):
+    if state_bus is None:
+        return
+    state_bus.publish("state", {"answer": (controller_id, answer),
+                                "version": state_version})
+
+
+def apply_state_sync(sender_id, data):
+    if sender_id == os.getpid():
+        return
+    if "answer" in data:
+        controller_id, answer = data["answer"]
+        state["controllers"].add(controller_id)
+        state["answers"][controller_id] = answer
+        mark_state_changed("answers", "controllers", version=data["version"])
+    else:
+        snapshot = data["snapshot"]
+        synced_values.update(copy.deepcopy(snapshot))
+        state.update(snapshot)
+        keys = [poll_key for key in snapshot
+                for poll_key in SYNCED_POLL_KEYS.get(key, ())]
+        mark_state_changed(*keys, version=data["version"])
+
+
+def apply_feed_sync(sender_id, data):
+    if sender_id == os.getpid():
+        return
+    event, payload = data
+    event_feed.publish(event, payload)
+
+
+def apply_analytics_sync(sender_id, data):
+    if sender_id == os.getpid():
+        return
+    buzz_log.record(*data)
+
+
+@app.after_request
+def sync_state_after_request(response):
+    # Answers sync inside process_answer, votes go over their channel
+    if (state_bus is not None and request.method == "POST"
+            and request.endpoint not in ("submit_answer",
+                                         "submit_answer_batch",
+                                         "submit_vote")):
+        sync_state()
+    return response
+
+
+def enable_shared_state():
+    """Move the hot counters into shared memory; call before forking."""
+    global shared_lock
+    import multiprocessing
+    from shared_state import SharedMap
+    shared_lock = multiprocessing.RLock()
+    for key in ("team_scores", "team_numbers", "counters"):
+        shared = SharedMap(MAX_SHARED_TEAMS, lock=shared_lock)
+        shared.update(state[key])
+        state[key] = shared
+
+
+def run_worker(index, fd, bus_address):
+    global state_bus
+    from werkzeug.serving import make_server
+    from local_bus import BusClient, BusClientManager
+
+    # The parent's log listener thread does not survive the fork
+    configure_logging()
+    state_bus = BusClient(bus_address)
+    state_bus.subscribe("state", apply_state_sync)
+    state_bus.subscribe("vote", apply_vote_sync)
+    state_bus.subscribe("feed", apply_feed_sync)
+    state_bus.subscribe("analytics", apply_analytics_sync)
+    # Route Socket.IO emits through the bus instead of local clients only
+    manager = BusClientManager(state_bus)
+    socketio.server.manager = manager
+    manager.set_server(socketio.server)
+    manager.initialize()
+    socketio.server.manager_initialized = True
+
+    on_host_ip_change(handle_host_ip_change)
+    start_host_ip_watcher()
+    if index == 0:
+        udp_protocol.start_listener("0.0.0.0", UDP_PORT, handle_udp_input)
+        # Votes are mirrored to every worker; one of them broadcasts
+        start_tally_ticker()
+    server = make_server("0.0.0.0", 5002, app, threaded=True, fd=fd)
+    log.info("Worker serving",
+             extra={"fields": {"worker": index, "pid": os.getpid()}})
+    server.serve_forever()
+
+
+def run_workers(num_workers, host="0.0.0.0", port=5002):
+    """Serve from several worker processes sharing one game state."""
+    import multiprocessing
+    import socket
+    from local_bus import BusHub
+
+    SOCKETIO_CLIENT_OPTIONS["transports"] = ["websocket"]
+    enable_shared_state()
+    bus_address = f"/tmp/buzzer-bus-{os.getpid()}.sock"
+    hub = BusHub(bus_address)
+    hub.start()
+    sock = socket.create_server((host, port))
+    sock.set_inheritable(True)
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=run_worker,
+                           args=(i, sock.fileno(), bus_address))
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    print(f"Game server running at http://{get_host_ip()}:{port}/ "
+          f"with {num_workers} workers")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        hub.close()
+        for key in ("team_scores", "team_numbers", "counters"):
+            state[key].close(unlink=True)
+
+
 if __name__ == "__main__":
-    print(f"Game server running at http://{get_host_ip()}:5002/")
-    socketio.run(app, host="0.0.0.0", port=5002, debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Buzzer game server")
+    parser.add_argument("--headless", action="store_true",
+                        help="Never touch audio output")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes sharing one game state "
+                             "(Linux only)")
+    args = parser.parse_args()
+    HEADLESS = HEADLESS or args.headless
+    configure_logging()
+    if args.workers > 1:
+        run_workers(args.workers)
+    else:
+        # debug=True runs this block in the Werkzeug reloader's watcher
+        # process as well; only the child that serves starts services
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            on_host_ip_change(handle_host_ip_change)
+            start_host_ip_watcher()
+            udp_protocol.start_listener("0.0.0.0", UDP_PORT,
+                                        handle_udp_input)
+            start_tally_ticker()
+        else:
+            print(f"Game server running at http://{get_host_ip()}:5002/")
+        socketio.run(app, host="0.0.0.0", port=5002, debug=True)
\ No newline at end of file
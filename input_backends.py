@@ -0,0 +1,356 @@
+"""Input backends for controller_client.
+
+A backend finds controllers and turns their raw events into button edges,
+reporting them to a sink with three methods:
+
+    sink.connected(device_id, name, joystick_id)
+    sink.disconnected(device_id)
+    sink.input(device_id, device_name, button, pressed, captured_at)
+
+Keyboards always report as device "keyboard" and are never registered,
+matching how the game server treats them.
+
+Backends:
+    pygame  pygame/SDL polling for gamepads, pynput (X11) for keyboards
+    evdev   reads /dev/input/event* directly on Linux with epoll, using
+            kernel event timestamps; needs the python-evdev package
+"""
+import logging
+import threading
+import time
+
+from virtual_buttons import AxisTracker, HatTracker
+
+KEYBOARD_ID = "keyboard"
+DETECT_INTERVAL = 2.0  # Seconds between controller hotplug scans
+
+log = logging.getLogger("buzzer.client")
+
+
+class InputBackend:
+    """Base class; run() blocks forever, feeding edges to the sink."""
+
+    name = None
+
+    def __init__(self, controller_id):
+        self.controller_id = controller_id
+        self.axis_tracker = AxisTracker()
+        self.hat_tracker = HatTracker()
+
+    def device_id(self, index):
+        return f"{self.controller_id}_{index}"
+
+    def run(self, sink):
+        raise NotImplementedError
+
+
+class PygameBackend(InputBackend):
+    name = "pygame"
+
+    def __init__(self, controller_id):
+        super().__init__(controller_id)
+        self.controllers = {}
+
+    def detect_controllers(self):
+        """Detect currently connected controllers"""
+        import pygame
+        pygame.joystick.quit()
+        pygame.joystick.init()
+        current_controllers = {}
+        for i in range(pygame.joystick.get_count()):
+            joystick = pygame.joystick.Joystick(i)
+            joystick.init()
+            current_controllers[i] = joystick
+        return current_controllers
+
+    def calibrate_axes(self, joy_id, joystick):
+        """Record resting axis values so triggers are told apart from
+        sticks."""
+        self.axis_tracker.forget(joy_id)
+        self.hat_tracker.forget(joy_id)
+        for axis in range(joystick.get_numaxes()):
+            self.axis_tracker.calibrate(joy_id, axis, joystick.get_axis(axis))
+
+    def start_keyboard(self, sink):
+        from pynput import keyboard
+
+        def key_name(key):
+            try:
+                return key.char if hasattr(key, 'char') and key.char \
+                    else str(key)
+            except Exception:
+                return str(key)
+
+        def on_press(key):
+            sink.input(KEYBOARD_ID, "Keyboard", key_name(key), True,
+                       time.time())
+
+        def on_release(key):
+            sink.input(KEYBOARD_ID, "Keyboard", key_name(key), False,
+                       time.time())
+
+        listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        listener.start()
+
+    def manage_controllers(self, sink):
+        """Dynamic controller detection, every DETECT_INTERVAL seconds."""
+        while True:
+            try:
+                current_controllers = self.detect_controllers()
+                # Check for newly connected controllers
+                for i, joystick in current_controllers.items():
+                    if i not in self.controllers:
+                        log.info("New controller detected %s: %s", i,
+                                 joystick.get_name())
+                        self.controllers[i] = joystick
+                        self.calibrate_axes(i, joystick)
+                        sink.connected(self.device_id(i), joystick.get_name(),
+                                       joystick.get_id())
+                # Check for disconnected controllers
+                for i in list(self.controllers.keys()):
+                    if i not in current_controllers:
+                        log.info("Controller %s disconnected", i)
+                        del self.controllers[i]
+                        sink.disconnected(self.device_id(i))
+            except Exception as e:
+                log.warning("Error in controller detection: %s", e)
+            time.sleep(DETECT_INTERVAL)
+
+    def run(self, sink):
+        import pygame
+
+        self.start_keyboard(sink)
+        pygame.init()
+        pygame.joystick.init()
+
+        # Initial controller detection
+        self.controllers = self.detect_controllers()
+        for i, joystick in self.controllers.items():
+            log.info("Detected controller %s: %s", i, joystick.get_name())
+            self.calibrate_axes(i, joystick)
+            sink.connected(self.device_id(i), joystick.get_name(),
+                           joystick.get_id())
+        if not self.controllers:
+            log.warning("No controllers detected. Keyboard input will still "
+                        "work.")
+        threading.Thread(target=self.manage_controllers, args=(sink,),
+                         daemon=True).start()
+
+        while True:
+            for event in pygame.event.get():
+                if event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+                    edges = [(event.button,
+                              event.type == pygame.JOYBUTTONDOWN)]
+                elif event.type == pygame.JOYAXISMOTION:
+                    edges = self.axis_tracker.update(event.joy, event.axis,
+                                                     event.value)
+                elif event.type == pygame.JOYHATMOTION:
+                    edges = self.hat_tracker.update(event.joy, event.hat,
+                                                    event.value)
+                else:
+                    continue
+                if not edges:
+                    continue
+                captured_at = time.time()
+                name = pygame.joystick.Joystick(event.joy).get_name()
+                for button, pressed in edges:
+                    sink.input(self.device_id(event.joy), name, button,
+                               pressed, captured_at)
+            time.sleep(0.01)
+
+
+# evdev codes -> the button ids pygame/SDL report, so the controller_mapping
+# profiles work unchanged. Axes follow SDL's order: left x/y, right x/y,
+# left/right trigger.
+EVDEV_BUTTONS = {
+    "BTN_A": 0, "BTN_B": 1, "BTN_X": 2, "BTN_Y": 3,
+    "BTN_SELECT": 4, "BTN_MODE": 5, "BTN_START": 6,
+    "BTN_THUMBL": 7, "BTN_THUMBR": 8, "BTN_TL": 9, "BTN_TR": 10,
+    "BTN_DPAD_UP": 11, "BTN_DPAD_DOWN": 12,
+    "BTN_DPAD_LEFT": 13, "BTN_DPAD_RIGHT": 14,
+}
+EVDEV_AXES = {
+    "ABS_X": 0, "ABS_Y": 1, "ABS_RX": 2, "ABS_RY": 3,
+    "ABS_Z": 4, "ABS_RZ": 5,
+}
+EVDEV_HATS = {"ABS_HAT0X": (0, 0), "ABS_HAT0Y": (0, 1)}
+
+
+def evdev_key_name(code_name):
+    """KEY_A -> "a", KEY_ESC -> "Key.esc", matching pynput's names."""
+    name = code_name[4:].lower()
+    if len(name) == 1:
+        return name
+    return f"Key.{name}"
+
+
+class EvdevBackend(InputBackend):
+    name = "evdev"
+
+    def __init__(self, controller_id, paths=None):
+        import evdev
+        super().__init__(controller_id)
+        self.evdev = evdev
+        self.ecodes = evdev.ecodes
+        self.paths = paths  # Restrict to these device nodes (tests)
+        self.devices = {}  # fd -> (device, kind, index)
+        self.hats = {}  # (index, hat) -> [x, y]
+        self.buttons = {getattr(self.ecodes, n): b
+                        for n, b in EVDEV_BUTTONS.items()}
+        self.axes = {getattr(self.ecodes, n): a
+                     for n, a in EVDEV_AXES.items()}
+        self.hat_codes = {getattr(self.ecodes, n): h
+                          for n, h in EVDEV_HATS.items()}
+        self.absinfo = {}  # (index, code) -> (min, max)
+
+    def classify(self, device):
+        keys = device.capabilities().get(self.ecodes.EV_KEY, [])
+        if self.ecodes.BTN_GAMEPAD in keys or self.ecodes.BTN_SOUTH in keys:
+            return "gamepad"
+        if self.ecodes.KEY_A in keys:
+            return "keyboard"
+        return None
+
+    def free_index(self):
+        used = {index for _, kind, index in self.devices.values()
+                if kind == "gamepad"}
+        index = 0
+        while index in used:
+            index += 1
+        return index
+
+    def scan(self, selector, sink):
+        import selectors
+        paths = self.paths or self.evdev.list_devices()
+        known = {device.path for device, _, _ in self.devices.values()}
+        for path in paths:
+            if path in known:
+                continue
+            try:
+                device = self.evdev.InputDevice(path)
+            except OSError:
+                continue
+            kind = self.classify(device)
+            if kind is None:
+                device.close()
+                continue
+            index = self.free_index() if kind == "gamepad" else None
+            self.devices[device.fd] = (device, kind, index)
+            selector.register(device.fd, selectors.EVENT_READ)
+            log.info("Detected %s %s: %s", kind, path, device.name)
+            if kind == "gamepad":
+                for code, info in device.capabilities(absinfo=True).get(
+                        self.ecodes.EV_ABS, []):
+                    self.absinfo[(index, code)] = (info.min, info.max)
+                    if code in self.axes:
+                        self.axis_tracker.calibrate(
+                            index, self.axes[code],
+                            self.normalize(index, code, info.value))
+                sink.connected(self.device_id(index), device.name, index)
+
+    def drop(self, fd, selector, sink):
+        device, kind, index = self.devices.pop(fd)
+        selector.unregister(fd)
+        log.info("Controller %s disconnected", device.path)
+        if kind == "gamepad":
+            self.axis_tracker.forget(index)
+            self.hat_tracker.forget(index)
+            sink.disconnected(self.device_id(index))
+        try:
+            device.close()
+        except OSError:
+            pass
+
+    def normalize(self, index, code, value):
+        low, high = self.absinfo.get((index, code), (-1, 1))
+        if high == low:
+            return 0.0
+        return (value - low) * 2.0 / (high - low) - 1.0
+
+    def edges(self, kind, index, event):
+        ecodes = self.ecodes
+        if event.type == ecodes.EV_KEY:
+            if event.value == 2:
+                return []  # Kernel auto-repeat
+            pressed = event.value == 1
+            if kind == "keyboard":
+                name = ecodes.KEY.get(event.code)
+                if isinstance(name, list):
+                    name = name[0]
+                if not name or not name.startswith("KEY_"):
+                    return []
+                return [(evdev_key_name(name), pressed)]
+            if event.code in self.buttons:
+                return [(self.buttons[event.code], pressed)]
+            return []
+        if event.type == ecodes.EV_ABS and kind == "gamepad":
+            if event.code in self.hat_codes:
+                hat, component = self.hat_codes[event.code]
+                value = self.hats.setdefault((index, hat), [0, 0])
+                # evdev reports up as -1, pygame as +1
+                value[component] = event.value if component == 0 \
+                    else -event.value
+                return self.hat_tracker.update(index, hat, tuple(value))
+            if event.code in self.axes:
+                return self.axis_tracker.update(
+                    index, self.axes[event.code],
+                    self.normalize(index, event.code, event.value))
+        return []
+
+    def run(self, sink):
+        import selectors
+        selector = selectors.DefaultSelector()  # epoll on Linux
+        self.scan(selector, sink)
+        next_scan = time.monotonic() + DETECT_INTERVAL
+        while True:
+            for key, _ in selector.select(timeout=DETECT_INTERVAL):
+                device, kind, index = self.devices[key.fd]
+                try:
+                    events = list(device.read())
+                except OSError:
+                    self.drop(key.fd, selector, sink)
+                    continue
+                for event in events:
+                    for button, pressed in self.edges(kind, index, event):
+                        if kind == "keyboard":
+                            sink.input(KEYBOARD_ID, "Keyboard", button,
+                                       pressed, event.timestamp())
+                        else:
+                            sink.input(self.device_id(index), device.name,
+                                       button, pressed, event.timestamp())
+            if time.monotonic() >= next_scan:
+                self.scan(selector, sink)
+                next_scan = time.monotonic() + DETECT_INTERVAL
+
+
+BACKENDS = {
+    PygameBackend.name: PygameBackend,
+    EvdevBackend.name: EvdevBackend,
+}
+
+
+def create_backend(name, controller_id):
+    return BACKENDS[name](controller_id)
+
+
+def create_virtual_gamepad(name="Xbox Virtual Pad"):
+    """Create a uinput gamepad (needs write access to /dev/uinput).
+
+    Returns the evdev.UInput; write events to it with write()/syn() and the
+    evdev backend sees them as a real controller (see
+    tests/test_evdev_backend.py).
+    """
+    from evdev import AbsInfo, UInput, ecodes
+    capabilities = {
+        ecodes.EV_KEY: [getattr(ecodes, n) for n in EVDEV_BUTTONS],
+        ecodes.EV_ABS: [
+            (ecodes.ABS_X, AbsInfo(0, -32768, 32767, 16, 128, 0)),
+            (ecodes.ABS_Y, AbsInfo(0, -32768, 32767, 16, 128, 0)),
+            (ecodes.ABS_Z, AbsInfo(0, 0, 255, 0, 0, 0)),
+            (ecodes.ABS_RZ, AbsInfo(0, 0, 255, 0, 0, 0)),
+            (ecodes.ABS_HAT0X, AbsInfo(0, -1, 1, 0, 0, 0)),
+            (ecodes.ABS_HAT0Y, AbsInfo(0, -1, 1, 0, 0, 0)),
+        ],
+    }
+    return UInput(capabilities, name=name)
+
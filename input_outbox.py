@@ -0,0 +1,74 @@
+"""Store-and-forward buffer for inputs the server could not receive."""
+import collections
+import logging
+import threading
+import time
+
+log = logging.getLogger("buzzer.client")
+
+
+class Outbox:
+    """Bounded queue of timestamped inputs, flushed in batches.
+
+    send_batch(inputs) is called from a background thread with the queued
+    inputs (oldest first) and returns True once the server has them. On
+    failure the flush is retried with exponential backoff. Inputs older
+    than `ttl` seconds are dropped before each attempt, so a long outage
+    cannot replay stale presses as buzzes; when `size` is exceeded the
+    oldest input is dropped.
+    """
+
+    def __init__(self, send_batch, size=256, ttl=3.0, backoff=0.25,
+                 max_backoff=5.0):
+        self.send_batch = send_batch
+        self.ttl = ttl
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._items = collections.deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        """Queue an input dict; it must carry a "captured_at" time."""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                log.warning("Outbox full, dropping oldest input")
+            self._items.append(item)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        expired = 0
+        while self._items and self._items[0]["captured_at"] < cutoff:
+            self._items.popleft()
+            expired += 1
+        if expired:
+            log.info("Dropped %d stale inputs from outbox", expired)
+
+    def _run(self):
+        delay = self.backoff
+        while True:
+            with self._cond:
+                self._expire()
+                while not self._items:
+                    self._cond.wait()
+                    self._expire()
+                batch = list(self._items)
+            if self.send_batch(batch):
+                sent = {id(item) for item in batch}
+                with self._cond:
+                    # Inputs added during the send stay queued
+                    while self._items and id(self._items[0]) in sent:
+                        self._items.popleft()
+                delay = self.backoff
+                log.info("Flushed %d queued inputs", len(batch))
+                continue
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
@@ -0,0 +1,194 @@
+"""Record controller inputs to a JSONL trace and replay them.
+
+Traces hold raw captures, before the client's debouncing. Replay runs them
+through the same EdgeTracker and, like the client, skips releases unless
+asked to send them, so the server sees what a live client would send.
+
+Usage:
+    python input_trace.py replay trace.jsonl [--speed 10] [--server URL]
+                                             [--debounce MS] [--send-releases]
+    python input_trace.py summary trace.jsonl
+"""
+import argparse
+import json
+import threading
+import time
+
+from virtual_buttons import DEBOUNCE_INTERVAL, EdgeTracker
+
+
+class InputRecorder:
+    """Append every raw captured input to a JSONL trace file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Line buffered so a crash mid-show keeps everything captured so far
+        self._file = open(path, "a", buffering=1)
+
+    def record(self, controller_id, button, pressed, answer, captured_at):
+        line = json.dumps({
+            "t": captured_at,
+            "device": controller_id,
+            "button": button,
+            "pressed": pressed,
+            "answer": answer,
+        }, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_trace(path):
+    """Return recorded inputs in capture order."""
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def client_edges(events, debounce=DEBOUNCE_INTERVAL):
+    """The edges controller_client forwards for raw captured `events`."""
+    tracker = EdgeTracker(debounce)
+    answers = {}  # (device, button) -> answer of the last press
+    edges = []
+
+    def edge(device, button, pressed, t):
+        answer = answers.get((device, button)) if pressed else None
+        edges.append({"t": t, "device": device, "button": button,
+                      "pressed": pressed, "answer": answer})
+
+    for event in events:
+        for device, button, t in tracker.flush(event["t"]):
+            edge(device, button, False, t)
+        if event["pressed"]:
+            answers[(event["device"], event["button"])] = event["answer"]
+        for button, pressed, t in tracker.update(
+                event["device"], event["button"], event["pressed"],
+                event["t"]):
+            edge(event["device"], button, pressed, t)
+    for device, button, t in tracker.flush(float("inf")):
+        edge(device, button, False, t)
+    edges.sort(key=lambda e: e["t"])
+    return edges
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def replay(path, server_url, speed=1.0, debounce=DEBOUNCE_INTERVAL,
+           send_releases=False):
+    """Feed a trace into a game server.
+
+    speed is a multiplier on real time; 0 sends as fast as possible.
+    Returns a dict with per-input results and latency stats.
+    """
+    import requests
+
+    events = [e for e in client_edges(read_trace(path), debounce)
+              if e["pressed"] or send_releases]
+    session = requests.Session()
+    results = []
+    if not events:
+        return {"results": results, "latency_ms": {}}
+    trace_start = events[0]["t"]
+    replay_start = time.perf_counter()
+    for event in events:
+        if speed > 0:
+            due = replay_start + (event["t"] - trace_start) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent = time.perf_counter()
+        try:
+            resp = session.post(
+                f"{server_url}/api/answer",
+                json={
+                    "controller_id": event["device"],
+                    "answer": event["answer"],
+                    "captured_at": time.time(),
+                },
+                timeout=2
+            )
+            body = resp.json() if resp.ok else {}
+            error = None if resp.ok else resp.text
+        except requests.RequestException as e:
+            body = {}
+            error = str(e)
+        latency_ms = (time.perf_counter() - sent) * 1000
+        results.append({
+            "t": event["t"] - trace_start,
+            "device": event["device"],
+            "answer": event["answer"],
+            "team": body.get("team"),
+            "latency_ms": round(latency_ms, 3),
+            "error": error,
+        })
+    latencies = [r["latency_ms"] for r in results if r["error"] is None]
+    return {
+        "results": results,
+        "buzzes": [r for r in results if r["team"]],
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        },
+        "errors": sum(1 for r in results if r["error"] is not None),
+        "wall_time_s": round(time.perf_counter() - replay_start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    replay_parser = sub.add_parser("replay", help="Replay a trace")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--server", default="http://localhost:5002")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Time multiplier, 0 = as fast as possible")
+    replay_parser.add_argument("--debounce", type=float, metavar="MS",
+                               default=DEBOUNCE_INTERVAL * 1000,
+                               help="Debounce interval, as on the client")
+    replay_parser.add_argument("--send-releases", action="store_true",
+                               help="Also send releases, as the client's "
+                                    "--send-releases does")
+    replay_parser.add_argument("--out", help="Write full results as JSON")
+    summary_parser = sub.add_parser("summary", help="Describe a trace")
+    summary_parser.add_argument("trace")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        events = read_trace(args.trace)
+        presses = [e for e in events if e["pressed"]]
+        sent = [e for e in client_edges(events) if e["pressed"]]
+        duration = events[-1]["t"] - events[0]["t"] if events else 0
+        print(f"{len(events)} inputs ({len(presses)} presses, "
+              f"{len(sent)} after debouncing) "
+              f"from {len({e['device'] for e in events})} devices "
+              f"over {duration:.1f}s")
+        return
+
+    report = replay(args.trace, args.server, args.speed,
+                    args.debounce / 1000, args.send_releases)
+    print(f"Replayed {len(report['results'])} inputs "
+          f"in {report.get('wall_time_s', 0)}s, "
+          f"{report.get('errors', 0)} errors")
+    print(f"Latency ms: {report['latency_ms']}")
+    for buzz in report.get("buzzes", []):
+        print(f"  {buzz['t']:8.3f}s {buzz['device']} -> {buzz['team']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
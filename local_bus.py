@@ -0,0 +1,115 @@
+"""Local inter-process message bus for multi-worker mode.
+
+The parent process runs a BusHub on a Unix socket and every worker connects
+a BusClient. The hub relays each message to all workers, including the
+sender, which is what python-socketio's pub/sub managers expect.
+"""
+import logging
+import os
+import pickle
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+
+from socketio import PubSubManager
+
+log = logging.getLogger("buzzer.net")
+
+
+class BusHub:
+    """Relay every message to every connected worker."""
+
+    def __init__(self, address):
+        self.address = address
+        self._conns = []
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def start(self):
+        self._listener = Listener(self.address, family="AF_UNIX")
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._conns.append(conn)
+            threading.Thread(target=self._relay, args=(conn,),
+                             daemon=True).start()
+
+    def _relay(self, conn):
+        while True:
+            try:
+                message = conn.recv_bytes()
+            except (EOFError, OSError):
+                with self._lock:
+                    self._conns.remove(conn)
+                return
+            # Relayed as raw bytes; the hub never unpickles
+            with self._lock:
+                for other in self._conns:
+                    try:
+                        other.send_bytes(message)
+                    except OSError:
+                        pass
+
+
+class BusClient:
+    """A worker's connection to the hub, with per-channel subscribers."""
+
+    def __init__(self, address):
+        self.sender_id = os.getpid()
+        self._conn = Client(address, family="AF_UNIX")
+        self._send_lock = threading.Lock()
+        self._subscribers = {}
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def publish(self, channel, data):
+        message = pickle.dumps((channel, self.sender_id, data))
+        with self._send_lock:
+            self._conn.send_bytes(message)
+
+    def subscribe(self, channel, callback):
+        """Call callback(sender_id, data) for every message on channel."""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def _read(self):
+        while True:
+            try:
+                channel, sender_id, data = pickle.loads(
+                    self._conn.recv_bytes())
+            except (EOFError, OSError):
+                return
+            for callback in self._subscribers.get(channel, []):
+                try:
+                    callback(sender_id, data)
+                except Exception:
+                    log.exception("Bus subscriber for %s failed", channel)
+
+
+class BusClientManager(PubSubManager):
+    """Socket.IO client manager that fans emits out over the local bus."""
+
+    name = "localbus"
+
+    def __init__(self, bus, channel="socketio", write_only=False,
+                 logger=None):
+        super().__init__(channel=channel, write_only=write_only,
+                         logger=logger)
+        self.bus = bus
+        self._queue = queue.Queue()
+        bus.subscribe(channel, lambda sender_id, data: self._queue.put(data))
+
+    def _publish(self, data):
+        self.bus.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
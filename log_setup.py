@@ -0,0 +1,134 @@
+"""Structured logging with formatting and I/O off the calling thread.
+
+Loggers live under "buzzer" (buzzer.input, buzzer.controllers, ...). Calls
+only enqueue the record; a background QueueListener formats it, writes it
+to stderr and keeps it in an in-memory ring buffer for the master UI.
+
+Levels come from the environment:
+    BUZZER_LOG_LEVEL=INFO                 console level (default WARNING)
+    BUZZER_LOG_LEVELS=input=DEBUG,net=INFO   per-subsystem logger levels
+"""
+import logging
+import os
+import queue
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = "buzzer"
+DEFAULT_LEVEL = "WARNING"
+RING_LEVEL = logging.INFO
+RING_SIZE = 500
+
+_listener = None
+_ring = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Render "time level logger message key=value ..." lines."""
+
+    def format(self, record):
+        line = (f"{self.formatTime(record, '%H:%M:%S')} "
+                f"{record.levelname:<7} {record.name} {record.getMessage()}")
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v!r}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class RingBufferHandler(logging.Handler):
+    """Keep the most recent records as plain dicts."""
+
+    def __init__(self, size=RING_SIZE, level=RING_LEVEL):
+        super().__init__(level)
+        self.records = deque(maxlen=size)
+
+    def emit(self, record):
+        self.records.append({
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "fields": getattr(record, "fields", None) or {},
+        })
+
+
+class SubsystemLevelFilter(logging.Filter):
+    """Console threshold per subsystem, falling back to a default level."""
+
+    def __init__(self, default_level, subsystem_levels):
+        super().__init__()
+        self.default_level = default_level
+        self.levels = subsystem_levels
+
+    def filter(self, record):
+        name = record.name
+        while name:
+            if name in self.levels:
+                return record.levelno >= self.levels[name]
+            name = name.rpartition(".")[0]
+        return record.levelno >= self.default_level
+
+
+class _DeferredQueueHandler(QueueHandler):
+    # The stock handler formats the message before enqueueing; leave that
+    # to the listener thread instead
+    def prepare(self, record):
+        return record
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if not name.startswith(ROOT_LOGGER):
+            name = f"{ROOT_LOGGER}.{name}"
+        levels[name] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def configure_logging(level=None, subsystem_levels=None):
+    """Install the queue-backed handlers on the "buzzer" logger.
+
+    Safe to call again, e.g. in a forked worker whose listener thread did
+    not survive the fork.
+    """
+    global _listener, _ring
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+    level = logging.getLevelName(
+        (level or os.environ.get("BUZZER_LOG_LEVEL") or DEFAULT_LEVEL).upper())
+    if subsystem_levels is None:
+        subsystem_levels = _parse_levels(
+            os.environ.get("BUZZER_LOG_LEVELS", ""))
+
+    console = logging.StreamHandler()
+    console.addFilter(SubsystemLevelFilter(level, subsystem_levels))
+    console.setFormatter(StructuredFormatter())
+    _ring = RingBufferHandler()
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [_DeferredQueueHandler(records)]
+    root.setLevel(min(level, RING_LEVEL))
+    root.propagate = False
+    for name, sub_level in subsystem_levels.items():
+        logging.getLogger(name).setLevel(sub_level)
+
+    _listener = QueueListener(records, console, _ring,
+                              respect_handler_level=True)
+    _listener.start()
+
+
+def recent_events(limit=100, min_level="DEBUG"):
+    """Most recent log records, newest last."""
+    if _ring is None:
+        return []
+    threshold = logging.getLevelName(min_level.upper())
+    events = [e for e in list(_ring.records)
+              if logging.getLevelName(e["level"]) >= threshold]
+    return events[-limit:]
@@ -0,0 +1,86 @@
+"""Media assets (images, audio) attached to questions.
+
+A question may name assets relative to the media directory:
+
+    {"question": "...", "image": "flags/france.png", "audio": "anthem.mp3"}
+
+Assets are served from content-hash URLs (/media/<digest>/<path>), so
+browsers can cache them forever and an edited file gets a new URL.
+"""
+import hashlib
+import mimetypes
+import os
+import stat
+import threading
+
+from werkzeug.security import safe_join
+
+MEDIA_KINDS = ("image", "audio")
+DIGEST_LENGTH = 16
+
+
+class MediaLibrary:
+    """Content-hash URLs for the files under one directory."""
+
+    def __init__(self, root, url_prefix="/media"):
+        self.root = root
+        self.url_prefix = url_prefix
+        self._digests = {}  # path -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        """Content hash of a media file, or None if it does not exist.
+
+        Paths that leave the media directory or are not regular files are
+        treated as missing. Cached until the file's mtime or size changes.
+        """
+        full_path = safe_join(self.root, path)
+        if full_path is None:
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        h = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        digest = h.hexdigest()[:DIGEST_LENGTH]
+        with self._lock:
+            self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def url(self, path):
+        digest = self.digest(path)
+        if digest is None:
+            return None
+        return f"{self.url_prefix}/{digest}/{path}"
+
+    def assets(self, question):
+        """[{"kind", "url", "type"}] for the media a question references."""
+        assets = []
+        for kind in MEDIA_KINDS:
+            path = question.get(kind)
+            if not path:
+                continue
+            url = self.url(path)
+            if url is None:
+                continue
+            assets.append({
+                "kind": kind,
+                "url": url,
+                "type": mimetypes.guess_type(path)[0],
+            })
+        return assets
+
+    def question_with_media(self, question):
+        """Copy of a question with its media resolved to asset URLs."""
+        question = dict(question)
+        question["media"] = self.assets(question)
+        return question
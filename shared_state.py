@@ -0,0 +1,151 @@
+"""Small key/value maps living in shared memory, for multi-worker mode.
+
+A SharedMap is created in the parent process before workers are forked, so
+every worker sees the same segment and lock. It behaves like a dict whose
+keys are short strings and whose values are ints, short strings or None.
+"""
+import multiprocessing
+import struct
+from collections.abc import MutableMapping
+from multiprocessing import shared_memory
+
+KEY_SIZE = 64
+VALUE_SIZE = 32
+HEADER = struct.Struct("<Q")  # Next insertion order
+SLOT = struct.Struct(f"<BQB{KEY_SIZE}sBB{VALUE_SIZE}s")
+VALUE_NONE = 0
+VALUE_INT = 1
+VALUE_STR = 2
+INT = struct.Struct("<q")
+
+
+def _encode_value(value):
+    if value is None:
+        return VALUE_NONE, 0, b""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(f"Unsupported shared value: {value!r}")
+    if isinstance(value, int):
+        return VALUE_INT, INT.size, INT.pack(value)
+    data = value.encode()
+    if len(data) > VALUE_SIZE:
+        raise ValueError(f"Shared value too long: {value!r}")
+    return VALUE_STR, len(data), data
+
+
+def _decode_value(value_type, length, data):
+    if value_type == VALUE_INT:
+        return INT.unpack_from(data)[0]
+    if value_type == VALUE_STR:
+        return data[:length].decode()
+    return None
+
+
+class SharedMap(MutableMapping):
+    """Fixed-capacity, insertion-ordered mapping in a shared memory segment."""
+
+    def __init__(self, capacity=64, lock=None):
+        self.capacity = capacity
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=HEADER.size + SLOT.size * capacity)
+        self._shm.buf[:] = bytes(self._shm.size)
+        self.lock = lock or multiprocessing.RLock()
+        self._slot_cache = {}  # Per process: key -> slot index hint
+
+    def _offset(self, slot):
+        return HEADER.size + slot * SLOT.size
+
+    def _read(self, slot):
+        (used, order, key_len, key, value_type, value_len,
+         value) = SLOT.unpack_from(self._shm.buf, self._offset(slot))
+        if not used:
+            return None
+        return (order, key[:key_len].decode(),
+                _decode_value(value_type, value_len, value))
+
+    def _find(self, key):
+        slot = self._slot_cache.get(key)
+        if slot is not None:
+            entry = self._read(slot)
+            if entry is not None and entry[1] == key:
+                return slot, entry
+        for slot in range(self.capacity):
+            entry = self._read(slot)
+            if entry is not None and entry[1] == key:
+                self._slot_cache[key] = slot
+                return slot, entry
+        return None, None
+
+    def __getitem__(self, key):
+        with self.lock:
+            _, entry = self._find(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[2]
+
+    def __setitem__(self, key, value):
+        key_bytes = key.encode()
+        if len(key_bytes) > KEY_SIZE:
+            raise ValueError(f"Shared key too long: {key!r}")
+        value_type, value_len, value_bytes = _encode_value(value)
+        with self.lock:
+            slot, entry = self._find(key)
+            if entry is not None:
+                order = entry[0]
+            else:
+                slot = next((s for s in range(self.capacity)
+                             if self._read(s) is None), None)
+                if slot is None:
+                    raise ValueError("Shared map is full")
+                order = HEADER.unpack_from(self._shm.buf)[0]
+                HEADER.pack_into(self._shm.buf, 0, order + 1)
+                self._slot_cache[key] = slot
+            SLOT.pack_into(self._shm.buf, self._offset(slot), 1, order,
+                           len(key_bytes), key_bytes, value_type, value_len,
+                           value_bytes)
+
+    def __delitem__(self, key):
+        with self.lock:
+            slot, entry = self._find(key)
+            if entry is None:
+                raise KeyError(key)
+            SLOT.pack_into(self._shm.buf, self._offset(slot), 0, 0, 0, b"",
+                           0, 0, b"")
+            self._slot_cache.pop(key, None)
+
+    def replace(self, mapping):
+        """Replace the whole contents with `mapping`, keeping its order.
+
+        Everything is validated first, so on ValueError the map is left
+        unchanged.
+        """
+        if len(mapping) > self.capacity:
+            raise ValueError("Shared map is full")
+        for key, value in mapping.items():
+            if len(key.encode()) > KEY_SIZE:
+                raise ValueError(f"Shared key too long: {key!r}")
+            _encode_value(value)
+        with self.lock:
+            self.clear()
+            self.update(mapping)
+
+    def _entries(self):
+        with self.lock:
+            entries = [self._read(slot) for slot in range(self.capacity)]
+        return sorted(e for e in entries if e is not None)
+
+    def __iter__(self):
+        return iter([key for _, key, _ in self._entries()])
+
+    def __len__(self):
+        return len(self._entries())
+
+    def items(self):
+        return [(key, value) for _, key, value in self._entries()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def close(self, unlink=False):
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
@@ -0,0 +1,82 @@
+"""Drive a uinput gamepad through EvdevBackend and check the edges it
+reports. Needs python-evdev and write access to /dev/uinput."""
+import os
+import queue
+import threading
+import time
+
+import pytest
+
+evdev = pytest.importorskip("evdev")
+
+from input_backends import EvdevBackend, create_virtual_gamepad  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not os.access("/dev/uinput", os.W_OK),
+    reason="needs write access to /dev/uinput")
+
+
+class QueueSink:
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def connected(self, device_id, name, joystick_id):
+        self.events.put(("connected", device_id))
+
+    def disconnected(self, device_id):
+        self.events.put(("disconnected", device_id))
+
+    def input(self, device_id, device_name, button, pressed, captured_at):
+        self.events.put((device_id, button, pressed))
+
+    def take(self, count, timeout=2.0):
+        return [self.events.get(timeout=timeout) for _ in range(count)]
+
+
+@pytest.fixture
+def pad():
+    pad = create_virtual_gamepad()
+    time.sleep(0.2)  # Let udev create the device node
+    yield pad
+    pad.close()
+
+
+def test_virtual_gamepad_edges(pad):
+    ecodes = evdev.ecodes
+    sink = QueueSink()
+    backend = EvdevBackend("test", paths=[pad.device.path])
+    threading.Thread(target=backend.run, args=(sink,), daemon=True).start()
+    assert sink.take(1) == [("connected", "test_0")]
+
+    for event_type, code, value in (
+            (ecodes.EV_KEY, ecodes.BTN_A, 1),
+            (ecodes.EV_KEY, ecodes.BTN_A, 0),
+            (ecodes.EV_ABS, ecodes.ABS_RZ, 255),
+            (ecodes.EV_ABS, ecodes.ABS_RZ, 0),
+            (ecodes.EV_ABS, ecodes.ABS_HAT0Y, -1),
+            (ecodes.EV_ABS, ecodes.ABS_HAT0Y, 0)):
+        pad.write(event_type, code, value)
+        pad.syn()
+
+    assert sink.take(6) == [
+        ("test_0", 0, True),
+        ("test_0", 0, False),
+        ("test_0", "axis5+", True),  # Trigger, calibrated to rest at -1
+        ("test_0", "axis5+", False),
+        ("test_0", "hat0_up", True),  # evdev reports up as -1
+        ("test_0", "hat0_up", False),
+    ]
+
+
+def test_jitter_below_threshold_sends_nothing(pad):
+    ecodes = evdev.ecodes
+    sink = QueueSink()
+    backend = EvdevBackend("test", paths=[pad.device.path])
+    threading.Thread(target=backend.run, args=(sink,), daemon=True).start()
+    assert sink.take(1) == [("connected", "test_0")]
+
+    for value in (2000, -2000, 3000, 0):  # Inside the stick deadzone
+        pad.write(ecodes.EV_ABS, ecodes.ABS_X, value)
+        pad.syn()
+    with pytest.raises(queue.Empty):
+        sink.take(1, timeout=0.3)
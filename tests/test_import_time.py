@@ -0,0 +1,58 @@
+"""Importing the entry points must stay cheap: no input, audio or HTTP
+client libraries and no file I/O until they are actually used."""
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pygame", "pynput", "requests")
+
+# Imports the module with an audit hook noting every opened file, then
+# reports which heavy modules got loaded
+PROBE = """
+import json, sys
+opened = []
+sys.addaudithook(lambda event, args: opened.append(str(args[0]))
+                 if event == "open" else None)
+import {module}
+print(json.dumps({{
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+    "opened": opened,
+}}))
+"""
+
+
+def import_module(module):
+    """Import `module` in a fresh interpreter; returns the probe report
+    and the module's cumulative import time in seconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, BUZZER_HEADLESS="1"))
+    assert result.returncode == 0, result.stderr
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {module}$",
+                      result.stderr, re.MULTILINE)
+    assert match, f"no importtime line for {module}"
+    return json.loads(result.stdout), int(match.group(1)) / 1e6
+
+
+@pytest.mark.parametrize("module, budget", [
+    ("controller_client", 0.5),
+    ("game_server", 2.0),
+])
+def test_import_is_light(module, budget):
+    report, seconds = import_module(module)
+    assert report["loaded"] == []
+    assert seconds < budget, f"importing {module} took {seconds:.2f}s"
+
+
+def test_game_server_import_does_not_read_questions():
+    report, _ = import_module("game_server")
+    opened = [path for path in report["opened"]
+              if os.path.basename(path) == "questions.json"]
+    assert opened == []
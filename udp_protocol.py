@@ -0,0 +1,130 @@
+"""Compact binary UDP input protocol.
+
+Datagram layout (network byte order):
+
+    magic     2s   b"WB"
+    version   B
+    edge      B    1 = press, 0 = release
+    session   I    random per sender run, resets sequence tracking
+    seq       I    per-controller sequence number
+    captured  d    capture time (seconds since the epoch, sender clock)
+    id_len    B
+    btn_len   B
+    controller_id  id_len bytes, utf-8
+    button         btn_len bytes, utf-8 (the answer sent on press)
+"""
+import logging
+import random
+import socket
+import struct
+import threading
+
+MAGIC = b"WB"
+VERSION = 1
+EDGE_RELEASE = 0
+EDGE_PRESS = 1
+HEADER = struct.Struct("!2sBBIIdBB")
+MAX_DATAGRAM = HEADER.size + 255 + 255
+
+log = logging.getLogger("buzzer.net")
+
+
+def pack_input(controller_id, button, pressed, session, seq, captured_at):
+    cid = controller_id.encode()[:255]
+    btn = str(button).encode()[:255]
+    edge = EDGE_PRESS if pressed else EDGE_RELEASE
+    return HEADER.pack(MAGIC, VERSION, edge, session, seq & 0xFFFFFFFF,
+                       captured_at, len(cid), len(btn)) + cid + btn
+
+
+def unpack_input(datagram):
+    """Decode a datagram into (controller_id, button, pressed, session, seq,
+    captured_at). Raises ValueError on malformed input."""
+    if len(datagram) < HEADER.size:
+        raise ValueError("Datagram too short")
+    (magic, version, edge, session, seq, captured_at,
+     id_len, btn_len) = HEADER.unpack_from(datagram)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unknown datagram format")
+    if len(datagram) != HEADER.size + id_len + btn_len:
+        raise ValueError("Datagram length mismatch")
+    offset = HEADER.size
+    controller_id = datagram[offset:offset + id_len].decode()
+    button = datagram[offset + id_len:].decode()
+    return (controller_id, button, edge == EDGE_PRESS, session, seq,
+            captured_at)
+
+
+class SequenceTracker:
+    """Drop duplicate and out-of-date datagrams per controller.
+
+    Uses serial number arithmetic so the 32-bit sequence can wrap.
+    """
+
+    def __init__(self):
+        self._last = {}  # controller_id -> (session, seq)
+
+    def accept(self, controller_id, session, seq):
+        last = self._last.get(controller_id)
+        if last is not None and last[0] == session:
+            delta = (seq - last[1]) & 0xFFFFFFFF
+            if delta == 0 or delta >= 0x80000000:
+                return False
+        self._last[controller_id] = (session, seq)
+        return True
+
+
+class UdpInputSender:
+    """Send input edges as datagrams, optionally repeated to cover loss."""
+
+    def __init__(self, host, port, redundancy=1):
+        self.address = (host, port)
+        self.redundancy = max(1, redundancy)
+        self.session = random.getrandbits(32)
+        self._seq = {}
+        self._lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, controller_id, button, pressed, captured_at):
+        with self._lock:
+            seq = self._seq.get(controller_id, 0) + 1
+            self._seq[controller_id] = seq
+        datagram = pack_input(controller_id, button, pressed, self.session,
+                              seq, captured_at)
+        for _ in range(self.redundancy):
+            self._sock.sendto(datagram, self.address)
+
+
+def serve(host, port, handler):
+    """Receive datagrams forever, calling handler(controller_id, button,
+    pressed, captured_at, addr) for each new input."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((host, port))
+    except OSError as e:
+        log.error("Cannot listen for UDP input on %s:%d: %s", host, port, e)
+        sock.close()
+        return
+    tracker = SequenceTracker()
+    while True:
+        datagram, addr = sock.recvfrom(MAX_DATAGRAM)
+        try:
+            (controller_id, button, pressed, session, seq,
+             captured_at) = unpack_input(datagram)
+        except (ValueError, UnicodeDecodeError):
+            continue
+        if not tracker.accept(controller_id, session, seq):
+            continue
+        try:
+            handler(controller_id, button, pressed, captured_at, addr)
+        except Exception:
+            log.exception("Error handling UDP input from %s", addr[0])
+
+
+def start_listener(host, port, handler):
+    """Run serve() on a daemon thread."""
+    thread = threading.Thread(target=serve, args=(host, port, handler),
+                              daemon=True)
+    thread.start()
+    return thread
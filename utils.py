@@ -1,8 +1,21 @@
+import logging
 import socket
+import threading
+import time
 
 
-def get_host_ip():
-    """Get the local IP address of the host machine."""
+log = logging.getLogger("buzzer.net")
+
+# Cached host address state, refreshed by the background watcher
+_host_ip = None
+_candidate_ips = []
+_ip_lock = threading.Lock()
+_ip_listeners = []
+_watcher_thread = None
+
+
+def _resolve_host_ip():
+    """Resolve the outbound LAN address of the host machine."""
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
         # doesn't have to be reachable
@@ -12,4 +25,78 @@ def get_host_ip():
         IP = "127.0.0.1"
     finally:
         s.close()
-    return IP
\ No newline at end of file
+    return IP
+
+
+def _resolve_candidate_ips(primary):
+    """Collect every IPv4 address this host is known by, primary first."""
+    ips = [primary]
+    try:
+        infos = socket.getaddrinfo(socket.gethostname(), None,
+                                   socket.AF_INET)
+    except OSError:
+        infos = []
+    for info in infos:
+        ip = info[4][0]
+        if ip not in ips and not ip.startswith("127."):
+            ips.append(ip)
+    return ips
+
+
+def refresh_host_ip():
+    """Re-resolve the host addresses. Returns True if anything changed."""
+    global _host_ip, _candidate_ips
+    primary = _resolve_host_ip()
+    candidates = _resolve_candidate_ips(primary)
+    with _ip_lock:
+        changed = primary != _host_ip or candidates != _candidate_ips
+        _host_ip = primary
+        _candidate_ips = candidates
+    if changed:
+        for callback in list(_ip_listeners):
+            try:
+                callback(primary, list(candidates))
+            except Exception:
+                log.exception("Host IP listener failed")
+    return changed
+
+
+def get_host_ip():
+    """Get the local IP address of the host machine (cached)."""
+    if _host_ip is None:
+        refresh_host_ip()
+    return _host_ip
+
+
+def get_candidate_ips():
+    """Get all LAN addresses of the host machine (cached)."""
+    if _host_ip is None:
+        refresh_host_ip()
+    return list(_candidate_ips)
+
+
+def on_host_ip_change(callback):
+    """Register callback(host_ip, candidate_ips) for address changes."""
+    _ip_listeners.append(callback)
+
+
+def start_host_ip_watcher(interval=5.0):
+    """Start a daemon thread that refreshes the cached host addresses."""
+    global _watcher_thread
+    if _watcher_thread is not None:
+        return _watcher_thread
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                if refresh_host_ip():
+                    log.info("Host address changed",
+                             extra={"fields": {"host_ip": _host_ip}})
+            except Exception as e:
+                log.warning("Host IP watcher error: %s", e)
+
+    get_host_ip()
+    _watcher_thread = threading.Thread(target=watch, daemon=True)
+    _watcher_thread.start()
+    return _watcher_thread
@@ -0,0 +1,164 @@
+"""Turn analog axes and hats into virtual button edges on the client.
+
+Virtual buttons are named "axis<N>+" / "axis<N>-" and "hat<N>_<direction>"
+so controller_mapping profiles can give them display names like any other
+button id. EdgeTracker then filters every device's edges down to one press
+per physical press.
+"""
+
+AXIS_PRESS_THRESHOLD = 0.6
+AXIS_RELEASE_THRESHOLD = 0.4  # Lower than press, gives hysteresis
+AXIS_DEADZONE = 0.15
+DEBOUNCE_INTERVAL = 0.03  # Seconds; switch bounce settles well within this
+
+HAT_DIRECTIONS = {
+    "up": (1, 1),
+    "down": (1, -1),
+    "left": (0, -1),
+    "right": (0, 1),
+}
+
+
+def axis_button_id(axis, direction):
+    return f"axis{axis}{'+' if direction > 0 else '-'}"
+
+
+def hat_button_id(hat, direction):
+    return f"hat{hat}_{direction}"
+
+
+class AxisTracker:
+    """Emit a press edge when an axis crosses the press threshold and a
+    release edge when it falls back below the release threshold, so stick
+    jitter never turns into traffic."""
+
+    def __init__(self, press_threshold=AXIS_PRESS_THRESHOLD,
+                 release_threshold=AXIS_RELEASE_THRESHOLD,
+                 deadzone=AXIS_DEADZONE):
+        self.press_threshold = press_threshold
+        self.release_threshold = release_threshold
+        self.deadzone = deadzone
+        self._triggers = {}  # (device, axis) -> rests at -1
+        self._direction = {}  # (device, axis) -> -1, 0 or 1
+
+    def calibrate(self, device, axis, rest_value):
+        """Record an axis' resting value; triggers rest at -1."""
+        self._triggers[(device, axis)] = rest_value < -0.5
+
+    def forget(self, device):
+        for key in [k for k in self._direction if k[0] == device]:
+            del self._direction[key]
+        for key in [k for k in self._triggers if k[0] == device]:
+            del self._triggers[key]
+
+    def update(self, device, axis, value):
+        """Feed a reading, return a list of (button_id, pressed) edges."""
+        key = (device, axis)
+        if key not in self._triggers:
+            # Uncalibrated: a fully negative first reading is a trigger
+            self.calibrate(device, axis, value if value <= -0.9 else 0.0)
+        if self._triggers[key]:
+            value = (value + 1) / 2
+        if abs(value) < self.deadzone:
+            value = 0.0
+
+        edges = []
+        direction = self._direction.get(key, 0)
+        if direction and value * direction < self.release_threshold:
+            edges.append((axis_button_id(axis, direction), False))
+            direction = 0
+        if not direction:
+            if value >= self.press_threshold:
+                direction = 1
+            elif value <= -self.press_threshold and not self._triggers[key]:
+                direction = -1
+            if direction:
+                edges.append((axis_button_id(axis, direction), True))
+        self._direction[key] = direction
+        return edges
+
+
+class HatTracker:
+    """Emit edges for hat directions as they become active or inactive."""
+
+    def __init__(self):
+        self._active = {}  # (device, hat) -> set of directions
+
+    def forget(self, device):
+        for key in [k for k in self._active if k[0] == device]:
+            del self._active[key]
+
+    def update(self, device, hat, value):
+        """Feed an (x, y) hat value, return a list of (button_id, pressed)."""
+        key = (device, hat)
+        active = {name for name, (component, sign) in HAT_DIRECTIONS.items()
+                  if value[component] == sign}
+        previous = self._active.get(key, set())
+        self._active[key] = active
+        edges = [(hat_button_id(hat, d), False)
+                 for d in sorted(previous - active)]
+        edges += [(hat_button_id(hat, d), True)
+                  for d in sorted(active - previous)]
+        return edges
+
+
+class EdgeTracker:
+    """Pass on only real press/release transitions per (device, button).
+
+    A press while the button is already down (keyboard auto-repeat) and a
+    second release are dropped. Releases are held back for `debounce`
+    seconds: a press arriving in that window is contact bounce, or X11's
+    release/press auto-repeat pair, and cancels the release, so the button
+    stays down. Held releases are collected with flush().
+    """
+
+    def __init__(self, debounce=DEBOUNCE_INTERVAL):
+        self.debounce = debounce
+        self._pressed = {}  # (device, button) -> bool
+        self._held = {}  # (device, button) -> time of the held release
+
+    def forget(self, device):
+        for key in [k for k in self._pressed if k[0] == device]:
+            del self._pressed[key]
+            self._held.pop(key, None)
+
+    def update(self, device, button, pressed, captured_at):
+        """Feed an edge, return a list of (button, pressed, captured_at)
+        edges to forward now."""
+        key = (device, button)
+        edges = []
+        released_at = self._held.get(key)
+        if released_at is not None:
+            if not pressed:
+                return edges
+            del self._held[key]
+            if captured_at - released_at < self.debounce:
+                return edges
+            # The held release was real; it goes out before this press
+            edges.append((button, False, released_at))
+            self._pressed[key] = False
+        if self._pressed.get(key, False) == pressed:
+            return edges
+        if pressed:
+            self._pressed[key] = True
+            edges.append((button, True, captured_at))
+        else:
+            self._held[key] = captured_at
+        return edges
+
+    def release_due(self):
+        """When the earliest held release is due, or None."""
+        if not self._held:
+            return None
+        return min(self._held.values()) + self.debounce
+
+    def flush(self, now):
+        """Release the buttons held for at least `debounce` seconds by
+        `now`; returns a (device, button, captured_at) list."""
+        released = []
+        for key, released_at in list(self._held.items()):
+            if now - released_at >= self.debounce:
+                del self._held[key]
+                self._pressed[key] = False
+                released.append((key[0], key[1], released_at))
+        return released
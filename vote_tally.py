@@ -0,0 +1,77 @@
+"""Incremental vote counting for "everyone answers" rounds."""
+import threading
+
+
+class VoteTally:
+    """Counts one vote per controller, per option and per team.
+
+    Each vote adjusts the counts in place (a changed vote moves one count
+    from the old option to the new), so a snapshot costs O(options * teams)
+    however many controllers are voting.
+    """
+
+    def __init__(self, options, correct=None):
+        self.options = list(options)
+        self.correct = correct  # Index of the correct option, if known
+        self.votes = {}  # controller_id -> (option, team)
+        self.counts = [0] * len(self.options)
+        self.team_counts = {}  # team -> [count per option]
+        self.version = 0  # Bumped on every change, for tick broadcasts
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def _adjust(self, option, team, delta):
+        self.counts[option] += delta
+        if team is not None:
+            counts = self.team_counts.get(team)
+            if counts is None:
+                counts = self.team_counts[team] = [0] * len(self.options)
+            counts[option] += delta
+
+    def vote(self, controller_id, option, team=None):
+        """Record or change a vote. Returns False if it was not counted."""
+        if not 0 <= option < len(self.options):
+            return False
+        with self._lock:
+            if self.closed:
+                return False
+            previous = self.votes.get(controller_id)
+            if previous == (option, team):
+                return True
+            if previous is not None:
+                self._adjust(previous[0], previous[1], -1)
+            self.votes[controller_id] = (option, team)
+            self._adjust(option, team, 1)
+            self.version += 1
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "options": self.options,
+                "counts": list(self.counts),
+                "team_counts": {team: list(counts) for team, counts
+                                in self.team_counts.items()},
+                "total": len(self.votes),
+                "closed": self.closed,
+                "version": self.version,
+            }
+
+    def close(self):
+        """Stop accepting votes; returns the final snapshot."""
+        with self._lock:
+            self.closed = True
+        return self.snapshot()
+
+    def score(self, points=1):
+        """Points earned per team: `points` for each correct vote.
+
+        Computed in one pass over the per-team counts once the round is
+        closed, rather than per vote.
+        """
+        if self.correct is None:
+            return {}
+        with self._lock:
+            return {team: counts[self.correct] * points
+                    for team, counts in self.team_counts.items()
+                    if counts[self.correct]}